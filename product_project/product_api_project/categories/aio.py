@@ -0,0 +1,69 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+
+from .models import Category
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # PyMongo is blocking, so async views hand each call to a bounded pool.
+    # Requests waiting for a free thread are parked on the event loop rather
+    # than holding a thread of their own.
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'MONGO_ASYNC_WORKERS', 32),
+                    thread_name_prefix='mongo-io',
+                )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    # run_in_executor does not carry context variables over to the pool
+    # thread, so run the call inside a copy of the caller's context.
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+
+
+class AsyncCategory:
+    @staticmethod
+    async def create(category_data):
+        return await run_blocking(Category.create, category_data)
+
+    @staticmethod
+    async def get_all(filters=None, fields=None, version=None):
+        return await run_blocking(Category.get_all, filters, fields=fields, version=version)
+
+    @staticmethod
+    async def get_by_id(category_id):
+        return await run_blocking(Category.get_by_id, category_id)
+
+    @staticmethod
+    async def update(category_id, data, expected_version=None):
+        return await run_blocking(Category.update, category_id, data, expected_version=expected_version)
+
+    @staticmethod
+    async def delete(category_id, expected_version=None, mode=None):
+        return await run_blocking(Category.delete, category_id, expected_version=expected_version, mode=mode)
+
+
+def _validate_and_save(serializer):
+    if serializer.is_valid():
+        return serializer.save(), None
+    return None, serializer.errors
+
+
+async def save_serializer(serializer):
+    # Field validation may hit Mongo (e.g. category checks), so the whole
+    # is_valid()/save() cycle runs on the I/O pool.
+    return await run_blocking(_validate_and_save, serializer)
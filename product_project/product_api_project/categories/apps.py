@@ -1,5 +1,32 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 class CategoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'categories'
\ No newline at end of file
+    name = 'categories'
+
+    def ready(self):
+        if getattr(settings, 'MONGO_CHANGE_STREAMS', False):
+            from .cache import watch_categories
+            watch_categories()
+        from mongo_common.mongo_config import on_first_request
+        on_first_request(self.prepare, dispatch_uid='categories.prepare')
+
+    def prepare(self):
+        if getattr(settings, 'CATEGORY_CATALOG', {}).get('ENABLED', False):
+            from .catalog import get_catalog
+            try:
+                get_catalog().load()
+            except Exception as e:
+                logger.warning('Could not load the category catalog: %s', e)
+        if not getattr(settings, 'MONGO_ENSURE_INDEXES_ON_STARTUP', True):
+            return
+        from .models import Category
+        from mongo_common.indexes import log_bad_plans, verify_query_plans
+        Category.ensure_indexes()
+        if getattr(settings, 'MONGO_VERIFY_QUERY_PLANS_ON_STARTUP', False):
+            log_bad_plans(verify_query_plans(Category.query_shapes()))
@@ -0,0 +1,121 @@
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from .aio import AsyncCategory, run_blocking, save_serializer
+from .models import CategoryInUse, CollectionVersion, DocumentNotFound, VersionConflict
+from .serializers import CategorySerializer
+from product_api.conditional import collection_etag, document_etag, expected_version, not_modified, set_validators
+from product_api.serializers import parse_fields, serialize
+import logging
+
+logger = logging.getLogger(__name__)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCategoryListView(View):
+    async def get(self, request):
+        try:
+            filters = {'name': request.GET.get('name', '')}
+            filters = {k: v for k, v in filters.items() if v}
+            logger.debug("GET filters: %s", filters)
+            try:
+                fields = parse_fields(request.GET.get('fields'), CategorySerializer)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            version = await run_blocking(CollectionVersion.get, 'categories')
+            etag = collection_etag(request, version)
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+            categories = await AsyncCategory.get_all(filters, fields=fields, version=version)
+            return set_validators(JsonResponse(serialize(CategorySerializer, categories, many=True, fields=fields), safe=False), etag)
+        except Exception as e:
+            logger.error("Error in AsyncCategoryListView.get: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+    async def post(self, request):
+        try:
+            data = {
+                'name': request.GET.get('name', ''),
+                'description': request.GET.get('description', '')
+            }
+            logger.debug("POST data: %s", data)
+            category, errors = await save_serializer(CategorySerializer(data=data))
+            if errors:
+                logger.error("Serializer errors: %s", errors)
+                return JsonResponse(errors, status=400)
+            return JsonResponse(CategorySerializer(category).data, status=201)
+        except Exception as e:
+            logger.error("Error in AsyncCategoryListView.post: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCategoryDetailView(View):
+    async def get(self, request):
+        try:
+            category_id = request.GET.get('id')
+            if not category_id:
+                return JsonResponse({'error': 'Category ID is required'}, status=400)
+            logger.debug("GET category_id: %s", category_id)
+            try:
+                fields = parse_fields(request.GET.get('fields'), CategorySerializer)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            category = await AsyncCategory.get_by_id(category_id)
+            if not category:
+                return JsonResponse({'error': 'Category not found'}, status=404)
+            etag = document_etag(request, category)
+            response = not_modified(request, etag, category.get('updated_at'))
+            if response is not None:
+                return response
+            return set_validators(JsonResponse(serialize(CategorySerializer, category, fields=fields)), etag, category.get('updated_at'))
+        except Exception as e:
+            logger.error("Error in AsyncCategoryDetailView.get: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+    async def put(self, request):
+        try:
+            category_id = request.GET.get('id')
+            if not category_id:
+                return JsonResponse({'error': 'Category ID is required'}, status=400)
+            try:
+                version = expected_version(request)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            data = {name: request.GET.get(name) for name in ('name', 'description') if name in request.GET}
+            logger.debug("PUT data: %s", data)
+            serializer = CategorySerializer({'id': category_id}, data=data, partial=True, context={'expected_version': version})
+            try:
+                updated_category, errors = await save_serializer(serializer)
+            except DocumentNotFound:
+                return JsonResponse({'error': 'Category not found'}, status=404)
+            except VersionConflict as e:
+                return JsonResponse({'error': str(e), 'version': e.current_version}, status=412)
+            if errors:
+                logger.error("Serializer errors: %s", errors)
+                return JsonResponse(errors, status=400)
+            return JsonResponse(CategorySerializer(updated_category).data)
+        except Exception as e:
+            logger.error("Error in AsyncCategoryDetailView.put: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+    async def delete(self, request):
+        try:
+            category_id = request.GET.get('id')
+            if not category_id:
+                return JsonResponse({'error': 'Category ID is required'}, status=400)
+            logger.debug("DELETE category_id: %s", category_id)
+            try:
+                await AsyncCategory.delete(category_id, expected_version=expected_version(request), mode=request.GET.get('on_delete'))
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            except CategoryInUse as e:
+                return JsonResponse({'error': str(e)}, status=409)
+            except DocumentNotFound:
+                return JsonResponse({'error': 'Category not found'}, status=404)
+            except VersionConflict as e:
+                return JsonResponse({'error': str(e), 'version': e.current_version}, status=412)
+            return HttpResponse(status=204)
+        except Exception as e:
+            logger.error("Error in AsyncCategoryDetailView.delete: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
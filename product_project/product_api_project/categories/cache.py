@@ -0,0 +1,44 @@
+from django.conf import settings
+
+from mongo_common import changestreams
+from mongo_common.cache import MISSING, build_cache
+from .catalog import get_catalog
+
+_category_cache = None
+
+
+def get_category_cache():
+    global _category_cache
+    if _category_cache is None:
+        _category_cache = build_cache(getattr(settings, 'CATEGORY_CACHE', {}), prefix='category:')
+    changestreams.ensure_started()
+    return _category_cache
+
+
+def apply_change(change):
+    # Entries are keyed by the ``id`` field, which only the looked-up full
+    # document carries; deletes (and updates of a since-deleted category)
+    # drop everything, which is cheap for a collection this small. The
+    # catalog, when enabled, refreshes on its next read.
+    category_id = (change.get('fullDocument') or {}).get('id')
+    if category_id:
+        get_category_cache().delete(category_id)
+    else:
+        get_category_cache().clear()
+    get_catalog().expire()
+
+
+def reset():
+    get_category_cache().clear()
+    get_catalog().expire()
+
+
+def watch_categories():
+    return changestreams.register(changestreams.ChangeStreamConsumer(
+        'categories',
+        'categories',
+        apply_change,
+        reset,
+        pipeline=[{'$project': {'operationType': 1, 'documentKey': 1, 'fullDocument.id': 1}}],
+        full_document='updateLookup',
+    ))
@@ -0,0 +1,207 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+
+from mongo_common import changestreams, mongo_config
+from product_api.serializers import projection
+from .search import normalize, rank_normalized
+
+logger = logging.getLogger(__name__)
+
+# Per-process snapshot of the whole category collection, used instead of the
+# read-through cache when CATEGORY_CATALOG['ENABLED'] is on. Records are
+# kept as tuples in RECORD_FIELDS order, next to a prebuilt map of
+# normalized names for the name filter.
+#
+# Reads older than MAX_STALENESS seconds trigger a refresh that fetches only
+# the documents whose updated_at is past the watermark (minus
+# WATERMARK_OVERLAP, to absorb clock skew between writers). Deletes leave
+# nothing to fetch. After merging, the snapshot holds every live category,
+# so a count that differs from the collection's means some were deleted
+# and the ids are reconciled. A full reload every FULL_RELOAD_INTERVAL
+# seconds is the backstop for anything the watermark missed.
+#
+# List reads pass the CollectionVersion their ETag was computed from. A
+# snapshot last synced at an older version is refreshed and reconciled
+# before answering, so a body never goes out under a newer version's tag.
+RECORD_FIELDS = ('id', 'name', 'description', 'version', 'updated_at')
+VERSION = RECORD_FIELDS.index('version')
+
+
+def catalog_settings():
+    return getattr(settings, 'CATEGORY_CATALOG', {})
+
+
+def catalog_enabled():
+    return catalog_settings().get('ENABLED', False)
+
+
+def _collection():
+    return mongo_config.get_collection('categories')
+
+
+class CategoryCatalog:
+    def __init__(self, max_staleness=5.0, overlap=5.0, full_reload_interval=600):
+        self.max_staleness = max_staleness
+        self.overlap = overlap
+        self.full_reload_interval = full_reload_interval
+        self._records = None
+        self._names = {}
+        self._watermark = None
+        self._refreshed_at = 0.0
+        self._loaded_at = 0.0
+        self._version = None
+        self.reinit()
+
+    def reinit(self):
+        # Also used after fork, where a lock held by another parent thread
+        # would otherwise stay locked forever in the child. The snapshot
+        # itself is still valid there.
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._records is not None
+
+    def _record(self, document):
+        return tuple(document.get(field) for field in RECORD_FIELDS)
+
+    def _put(self, document):
+        # An overlapping refresh may read a document older than a local
+        # write already applied here; keep the newer version.
+        current = self._records.get(document['id'])
+        if current is not None and (current[VERSION] or 0) > (document.get('version') or 0):
+            return
+        self._records[document['id']] = self._record(document)
+        self._names[document['id']] = normalize(document.get('name'))
+        updated_at = document.get('updated_at')
+        if updated_at and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+    def _discard(self, category_id):
+        self._records.pop(category_id, None)
+        self._names.pop(category_id, None)
+
+    def load(self):
+        started = time.monotonic()
+        records, names, watermark = {}, {}, None
+        for document in _collection().find({}, projection()):
+            records[document['id']] = self._record(document)
+            names[document['id']] = normalize(document.get('name'))
+            updated_at = document.get('updated_at')
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        self._records, self._names, self._watermark = records, names, watermark
+        self._refreshed_at = self._loaded_at = started
+        logger.debug('Category catalog loaded: %s categories', len(records))
+
+    def refresh(self, reconcile=False):
+        started = time.monotonic()
+        if not self.loaded or self._watermark is None or started - self._loaded_at >= self.full_reload_interval:
+            return self.load()
+        collection = _collection()
+        since = self._watermark - timedelta(seconds=self.overlap)
+        for document in collection.find({'updated_at': {'$gte': since}}, projection()):
+            self._put(document)
+        if reconcile or collection.count_documents({}) != len(self._records):
+            self.reconcile()
+        self._refreshed_at = started
+
+    def reconcile(self):
+        # Ids only, to keep the transfer small.
+        collection = _collection()
+        live = {document['id'] for document in collection.find({}, {'_id': 0, 'id': 1})}
+        for category_id in set(self._records) - live:
+            self._discard(category_id)
+        missing = list(live - set(self._records))
+        if missing:
+            for document in collection.find({'id': {'$in': missing}}, projection()):
+                self._put(document)
+
+    def _behind(self, version):
+        return version is not None and (self._version is None or version > self._version)
+
+    def _stale(self):
+        return not self.loaded or time.monotonic() - self._refreshed_at >= self.max_staleness
+
+    def ensure_fresh(self, version=None):
+        if not self._stale() and not self._behind(version):
+            return
+        # One thread refreshes; the others keep serving the current snapshot
+        # unless there is none yet or it is older than the version they need.
+        if self._lock.acquire(blocking=not self.loaded or self._behind(version)):
+            try:
+                behind = self._behind(version)
+                if behind or self._stale():
+                    self.refresh(reconcile=behind)
+                if behind:
+                    self._version = version
+            finally:
+                self._lock.release()
+
+    def expire(self):
+        # Next read refreshes (e.g. when a change stream reports a write).
+        self._refreshed_at = 0.0
+
+    def get(self, category_id, fields=None):
+        self.ensure_fresh()
+        record = self._records.get(category_id)
+        return self._to_dict(record, fields) if record is not None else None
+
+    def all(self, name=None, fields=None, version=None):
+        self.ensure_fresh(version)
+        records, names = self._records, self._names
+        if name:
+            matches = rank_normalized(((names.get(category_id, ''), category_id) for category_id in list(records)), name)
+            return [self._to_dict(records[category_id], fields) for category_id in matches if category_id in records]
+        return [self._to_dict(record, fields) for record in list(records.values())]
+
+    def _to_dict(self, record, fields=None):
+        document = dict(zip(RECORD_FIELDS, record))
+        if fields:
+            document = {field: document[field] for field in fields if field in document}
+        return document
+
+    def put(self, document):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._put(document)
+
+    def discard(self, category_id):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._discard(category_id)
+
+    def __len__(self):
+        return len(self._records or ())
+
+
+_catalog = None
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        config = catalog_settings()
+        _catalog = CategoryCatalog(
+            max_staleness=config.get('MAX_STALENESS', 5.0),
+            overlap=config.get('WATERMARK_OVERLAP', 5.0),
+            full_reload_interval=config.get('FULL_RELOAD_INTERVAL', 600),
+        )
+    changestreams.ensure_started()
+    return _catalog
+
+
+def _reinit_after_fork():
+    if _catalog is not None:
+        _catalog.reinit()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
@@ -1,61 +1,356 @@
-from pymongo import MongoClient
 import uuid
+from datetime import datetime, timezone
+from django.conf import settings
+from pymongo import ASCENDING, IndexModel, ReturnDocument, UpdateOne
+from mongo_common.indexes import build_indexes
+from mongo_common import mongo_config
+from product_api.serializers import projection
+from .cache import MISSING, get_category_cache
+from .catalog import catalog_enabled, get_catalog
+from .search import name_query, rank, search_fields
 
 class MongoDBConnection:
-    _instance = None
+    @classmethod
+    def get_client(cls):
+        return mongo_config.get_client()
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.client = MongoClient('mongodb://localhost:27017/product_db')
-            cls._instance.db = cls._instance.client['product_db']
-        return cls._instance
+    @classmethod
+    def get_db(cls):
+        return mongo_config.get_db()
 
     @classmethod
     def get_collection(cls, collection_name):
-        return cls().__getattribute__('db')[collection_name]
+        return mongo_config.get_collection(collection_name)
+
+def now():
+    # Naive UTC at millisecond precision, matching what BSON stores and
+    # pymongo reads back.
+    value = datetime.now(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+class DocumentNotFound(Exception):
+    pass
+
+class VersionConflict(Exception):
+    # An optimistic write found the document at another version.
+    def __init__(self, current_version):
+        super().__init__(f'Document is at version {current_version}')
+        self.current_version = current_version
+
+class CategoryInUse(Exception):
+    pass
+
+# Collections holding category ids: the id field, which must be indexed so
+# Category.delete/update can check or update them with a single indexed
+# query, and the field holding a denormalized copy of the category name.
+CATEGORY_REFERENCES = (('products', 'category_id', 'category_name'),)
+
+DELETE_MODES = ('reject', 'nullify', 'cascade')
+
+def denormalize_category_name():
+    return getattr(settings, 'PRODUCT_DENORMALIZE_CATEGORY_NAME', False)
+
+def versioned(query, expected_version=None):
+    # Documents written before versioning count as version 0.
+    if expected_version is not None:
+        query['version'] = expected_version or {'$in': [0, None]}
+    return query
+
+def raise_write_failed(collection, document_id, expected_version=None):
+    # Only reached when a find_one_and_* matched nothing, so the extra
+    # lookup telling a stale version from a missing document is off the
+    # happy path.
+    if expected_version is not None:
+        current = collection.find_one({'id': document_id}, {'_id': 0, 'version': 1})
+        if current is not None:
+            raise VersionConflict(current.get('version') or 0)
+    raise DocumentNotFound(document_id)
+
+def backfill_search_fields(collection_name, batch_size=1000):
+    # Adds the name search fields to documents written before they existed.
+    collection = MongoDBConnection.get_collection(collection_name)
+    cursor = collection.find({'name_grams': {'$exists': False}}, {'_id': 1, 'name': 1}).batch_size(batch_size)
+    updated = 0
+    operations = []
+    for document in cursor:
+        operations.append(UpdateOne({'_id': document['_id']}, {'$set': search_fields(document.get('name'))}))
+        if len(operations) == batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+class CollectionVersion:
+    # Monotonic per-collection write counter, shared by every worker through
+    # Mongo. Used to key caches of derived data (e.g. product stats) and the
+    # list ETags. Writers bump it in a second round trip after their write,
+    # not atomically with it: a worker dying in between leaves the write
+    # applied but the counter behind, so list ETags and version-keyed caches
+    # stay stale until the next write to the collection bumps it.
+    @staticmethod
+    def get(collection_name):
+        document = MongoDBConnection.get_collection('collection_versions').find_one({'_id': collection_name})
+        return document['version'] if document else 0
+
+    @staticmethod
+    def bump(collection_name):
+        MongoDBConnection.get_collection('collection_versions').update_one(
+            {'_id': collection_name},
+            {'$inc': {'version': 1}},
+            upsert=True
+        )
 
 class Category:
+    INDEXES = [
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+        IndexModel([('name_grams', ASCENDING)], name='name_grams'),
+        IndexModel([('name_lower', ASCENDING)], name='name_lower'),
+        IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+    ]
+
     def __init__(self, data=None):
         if data is None:
             data = {}
         self.id = str(data.get('id', uuid.uuid4()))
         self.name = data.get('name', '')
         self.description = data.get('description', '')
+        self.version = data.get('version', 1)
+        self.updated_at = data.get('updated_at') or now()
 
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
-            'description': self.description
+            'description': self.description,
+            'version': self.version,
+            'updated_at': self.updated_at
         }
 
+    def to_document(self):
+        return {**self.to_dict(), **search_fields(self.name)}
+
+    @staticmethod
+    def ensure_indexes():
+        build_indexes(MongoDBConnection.get_collection('categories'), Category.INDEXES)
+
+    @staticmethod
+    def query_shapes():
+        # Filtered reads issued by this model, for verify_query_plans.
+        collection = MongoDBConnection.get_collection('categories')
+        return [
+            ('Category.get_by_id', collection, {'id': 'example'}, None),
+            ('Category.get_many', collection, {'id': {'$in': ['example', 'other']}}, None),
+            ('Category.get_all name', collection, name_query('example'), None),
+            ('Category.get_all short name', collection, name_query('ex'), None),
+            ('CategoryCatalog.refresh', collection, {'updated_at': {'$gte': now()}}, None),
+        ]
+
     @staticmethod
     def create(category_data):
         category = Category(category_data)
-        MongoDBConnection.get_collection('categories').insert_one(category.to_dict())
+        MongoDBConnection.get_collection('categories').insert_one(category.to_document())
+        get_category_cache().delete(category.id)
+        get_catalog().put(category.to_dict())
+        CollectionVersion.bump('categories')
         return category
 
     @staticmethod
-    def get_all(filters=None):
+    def get_all(filters=None, fields=None, version=None):
+        # ``version`` is the CollectionVersion the caller's ETag came from.
         if filters is None:
             filters = {}
+        if catalog_enabled():
+            return get_catalog().all(filters.get('name'), fields=fields, version=version)
         query = {}
         if 'name' in filters:
-            query['name'] = {'$regex': filters['name'], '$options': 'i'}
-        return list(MongoDBConnection.get_collection('categories').find(query))
+            query.update(name_query(filters['name']))
+            required = ('name',)
+        else:
+            required = ()
+        categories = list(MongoDBConnection.get_collection('categories').find(query, projection(fields, required=required)))
+        if 'name' in filters:
+            categories = rank(categories, filters['name'])
+        return categories
 
     @staticmethod
     def get_by_id(category_id):
-        return MongoDBConnection.get_collection('categories').find_one({'id': category_id})
+        if catalog_enabled():
+            return Category.get_many([category_id]).get(category_id)
+        cache = get_category_cache()
+        category = cache.get(category_id)
+        if category is not MISSING:
+            return dict(category)
+        category = MongoDBConnection.get_collection('categories').find_one({'id': category_id}, projection())
+        if category:
+            cache.add(category_id, dict(category))
+        return category
 
     @staticmethod
-    def update(category_id, data):
-        return MongoDBConnection.get_collection('categories').update_one(
-            {'id': category_id},
-            {'$set': data}
+    def get_many(category_ids):
+        # Returns {id: category} for the ids that exist: cache hits first, then
+        # one $in query for the rest. With the catalog on, the rest are ids
+        # created since its last refresh, or that do not exist.
+        catalog = get_catalog() if catalog_enabled() else None
+        cache = get_category_cache()
+        found = {}
+        unresolved = []
+        for category_id in set(category_ids):
+            category = catalog.get(category_id) if catalog else cache.get(category_id)
+            if category not in (MISSING, None):
+                found[category_id] = dict(category)
+            else:
+                unresolved.append(category_id)
+        if unresolved:
+            cursor = MongoDBConnection.get_collection('categories').find({'id': {'$in': unresolved}}, projection())
+            for category in cursor:
+                if catalog:
+                    catalog.put(category)
+                else:
+                    cache.add(category['id'], dict(category))
+                found[category['id']] = category
+        return found
+
+    @staticmethod
+    def get_existing_ids(category_ids):
+        # Resolves a whole batch of ids with the cache plus a single $in query.
+        if catalog_enabled():
+            return set(Category.get_many(category_ids))
+        cache = get_category_cache()
+        existing = set()
+        unresolved = []
+        for category_id in set(category_ids):
+            if cache.get(category_id) is not MISSING:
+                existing.add(category_id)
+            else:
+                unresolved.append(category_id)
+        if unresolved:
+            cursor = MongoDBConnection.get_collection('categories').find(
+                {'id': {'$in': unresolved}},
+                {'_id': 0, 'id': 1}
+            )
+            existing.update(category['id'] for category in cursor)
+        return existing
+
+    @staticmethod
+    def update(category_id, data, expected_version=None):
+        # The conditional write is one atomic find_one_and_update returning
+        # the new document (DocumentNotFound or VersionConflict when nothing
+        # matched); the collection version is bumped separately after it.
+        if 'name' in data:
+            data = {**data, **search_fields(data['name'])}
+        collection = MongoDBConnection.get_collection('categories')
+        category = collection.find_one_and_update(
+            versioned({'id': category_id}, expected_version),
+            {'$set': {**data, 'updated_at': now()}, '$inc': {'version': 1}},
+            projection=projection(),
+            return_document=ReturnDocument.AFTER
         )
+        if category is None:
+            raise_write_failed(collection, category_id, expected_version)
+        # Evicted rather than replaced: a slower concurrent update could
+        # otherwise leave its older document cached after this one.
+        get_category_cache().delete(category_id)
+        get_catalog().put(category)
+        CollectionVersion.bump('categories')
+        if 'name' in data and denormalize_category_name():
+            Category.propagate_name(category_id, category['name'])
+        return category
 
     @staticmethod
-    def delete(category_id):
-        return MongoDBConnection.get_collection('categories').delete_one({'id': category_id})
\ No newline at end of file
+    def propagate_name(category_id, name):
+        # One update_many per referencing collection over the indexed id
+        # field, then a bump of that collection's version (not atomic with
+        # it, see CollectionVersion); documents already holding the name are
+        # left alone.
+        updated = 0
+        for collection_name, field, name_field in CATEGORY_REFERENCES:
+            count = MongoDBConnection.get_collection(collection_name).update_many(
+                {field: category_id, name_field: {'$ne': name}},
+                {'$set': {name_field: name, 'updated_at': now()}, '$inc': {'version': 1}}
+            ).modified_count
+            if count:
+                CollectionVersion.bump(collection_name)
+            updated += count
+        return updated
+
+    @staticmethod
+    def delete_mode(mode=None):
+        mode = mode or getattr(settings, 'CATEGORY_DELETE_MODE', 'reject')
+        if mode not in DELETE_MODES:
+            raise ValueError(f"on_delete must be one of: {', '.join(DELETE_MODES)}")
+        return mode
+
+    @staticmethod
+    def is_referenced(category_id):
+        return any(
+            MongoDBConnection.get_collection(name).find_one({field: category_id}, {'_id': 1}) is not None
+            for name, field, _ in CATEGORY_REFERENCES
+        )
+
+    @staticmethod
+    def release_references(category_ids, mode):
+        # One update_many / delete_many per referencing collection, however
+        # many documents point at the categories, each followed by its own
+        # version bump (see CollectionVersion). Returns the affected count.
+        affected = 0
+        for name, field, name_field in CATEGORY_REFERENCES:
+            collection = MongoDBConnection.get_collection(name)
+            query = {field: {'$in': list(category_ids)}}
+            if mode == 'cascade':
+                count = collection.delete_many(query).deleted_count
+            else:
+                cleared = {field: '', name_field: ''} if denormalize_category_name() else {field: ''}
+                count = collection.update_many(
+                    query,
+                    {'$set': {**cleared, 'updated_at': now()}, '$inc': {'version': 1}}
+                ).modified_count
+            if count:
+                CollectionVersion.bump(name)
+            affected += count
+        return affected
+
+    @staticmethod
+    def stored_ids(category_ids):
+        # Asks Mongo, never the cache or catalog: used to re-check references
+        # after writing them.
+        cursor = MongoDBConnection.get_collection('categories').find(
+            {'id': {'$in': list(category_ids)}},
+            {'_id': 0, 'id': 1}
+        )
+        return {category['id'] for category in cursor}
+
+    @staticmethod
+    def delete(category_id, expected_version=None, mode=None):
+        # Raises CategoryInUse in 'reject' mode when anything still refers to
+        # the category; otherwise references are nullified or deleted after
+        # the category is gone, so no new ones can be validated against it.
+        # In 'reject' mode references are checked again after the delete and
+        # the category is put back if one appeared in between; writers of
+        # references re-check the category after their write (Product.create,
+        # Product.bulk_insert), so one side always sees the other.
+        mode = Category.delete_mode(mode)
+        if mode == 'reject' and Category.is_referenced(category_id):
+            raise CategoryInUse(f'Category {category_id} is still in use')
+        collection = MongoDBConnection.get_collection('categories')
+        category = collection.find_one_and_delete(
+            versioned({'id': category_id}, expected_version),
+            projection=None if mode == 'reject' else {'_id': 0, 'id': 1, 'version': 1}
+        )
+        get_category_cache().delete(category_id)
+        get_catalog().discard(category_id)
+        if category is None:
+            raise_write_failed(collection, category_id, expected_version)
+        if mode == 'reject' and Category.is_referenced(category_id):
+            # A newer updated_at, so catalogs that dropped it pick it up again.
+            category['updated_at'] = now()
+            collection.insert_one(category)
+            get_category_cache().delete(category_id)
+            get_catalog().put(collection.find_one({'id': category_id}, projection()))
+            CollectionVersion.bump('categories')
+            raise CategoryInUse(f'Category {category_id} is still in use')
+        CollectionVersion.bump('categories')
+        if mode != 'reject':
+            category['released_references'] = Category.release_references([category_id], mode)
+            return category
+        return {'id': category['id'], 'version': category.get('version', 1)}
@@ -0,0 +1,66 @@
+import re
+
+# Names are indexed as the set of their lowercase character trigrams in a
+# multikey ``name_grams`` field. A search for "phon" becomes
+# {'name_grams': {'$all': ['hon', 'pho']}}, answered from the index, and the
+# few candidates are then checked and ranked here.
+GRAM_SIZE = 3
+SEARCH_FIELDS = ('name_lower', 'name_grams')
+
+
+def normalize(text):
+    return ' '.join(str(text or '').lower().split())
+
+
+def ngrams(text, size=GRAM_SIZE):
+    text = normalize(text)
+    return sorted({text[i:i + size] for i in range(len(text) - size + 1)})
+
+
+def search_fields(name):
+    return {'name_lower': normalize(name), 'name_grams': ngrams(name)}
+
+
+def name_query(term):
+    term = normalize(term)
+    grams = ngrams(term)
+    if grams:
+        return {'name_grams': {'$all': grams}}
+    if term:
+        # Too short for a trigram: anchored prefix scan on the name_lower index.
+        return {'name_lower': {'$regex': '^' + re.escape(term)}}
+    return {}
+
+
+def _score(name, term):
+    if name == term:
+        return 0
+    if name.startswith(term):
+        return 1
+    if f' {term}' in name:
+        return 2
+    if term in name:
+        return 3
+    return None
+
+
+def matches(name, term):
+    # The containment check rank() applies, for paths that keep index order.
+    return _score(normalize(name), normalize(term)) is not None
+
+
+def rank(documents, term):
+    """Drop trigram false positives and order by relevance: exact, prefix, word prefix, substring."""
+    return rank_normalized(((normalize(document.get('name')), document) for document in documents), term)
+
+
+def rank_normalized(entries, term):
+    """``rank`` over ``(normalized name, document)`` pairs, for names normalized ahead of time."""
+    term = normalize(term)
+    scored = []
+    for name, document in entries:
+        score = _score(name, term)
+        if score is not None:
+            scored.append((score, len(name), name, document))
+    scored.sort(key=lambda item: item[:3])
+    return [document for *_, document in scored]
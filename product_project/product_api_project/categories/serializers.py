@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from categories.models import Category
+from product_api.serializers import DynamicFieldsMixin
 
-class CategorySerializer(serializers.Serializer):
+class CategorySerializer(DynamicFieldsMixin, serializers.Serializer):
     id = serializers.CharField(read_only=True)
     name = serializers.CharField(max_length=100, required=True, allow_blank=False)
     description = serializers.CharField(allow_blank=True, required=False)
+    version = serializers.IntegerField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate_name(self, value):
         if not value.strip():
@@ -15,5 +18,4 @@ class CategorySerializer(serializers.Serializer):
         return Category.create(validated_data)
 
     def update(self, instance, validated_data):
-        Category.update(instance['id'], validated_data)
-        return Category.get_by_id(instance['id'])
\ No newline at end of file
+        return Category.update(instance['id'], validated_data, expected_version=self.context.get('expected_version'))
\ No newline at end of file
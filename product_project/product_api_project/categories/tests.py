@@ -1,3 +1,116 @@
-from django.test import TestCase
+from datetime import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from mongo_common import mongo_config
+from mongo_common.benchmarking import use_mongomock
+from products.models import Product
+from . import cache, catalog
+from .models import Category, CategoryInUse, CollectionVersion, DocumentNotFound, VersionConflict
+
+
+class CategoryWriteTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        self.category = Category.create({'name': 'Books'})
+
+    def test_stale_version_conflicts(self):
+        Category.update(self.category.id, {'name': 'Novels'})
+        with self.assertRaises(VersionConflict):
+            Category.update(self.category.id, {'name': 'Comics'}, expected_version=1)
+        self.assertEqual(Category.get_by_id(self.category.id)['name'], 'Novels')
+
+    def test_conditional_delete(self):
+        response = self.client.delete(f'/api/category/?id={self.category.id}&version=2')
+        self.assertEqual((response.status_code, response.json()['version']), (412, 1))
+        self.assertEqual(self.client.delete(f'/api/category/?id={self.category.id}&version=1').status_code, 204)
+        with self.assertRaises(DocumentNotFound):
+            Category.delete(self.category.id, expected_version=1)
+
+
+class CategoryDeleteModeTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        self.category = Category.create({'name': 'Books'})
+        self.product = Product.create({'name': 'Dune', 'price': 10.0, 'category_id': self.category.id})
+
+    def test_reject_refuses_while_referenced(self):
+        with self.assertRaises(CategoryInUse):
+            Category.delete(self.category.id, mode='reject')
+        self.assertIsNotNone(Category.get_by_id(self.category.id))
+        Product.delete(self.product.id)
+        Category.delete(self.category.id, mode='reject')
+        self.assertIsNone(Category.get_by_id(self.category.id))
+
+    def test_reject_restores_a_category_referenced_mid_delete(self):
+        Product.delete(self.product.id)
+        is_referenced = Category.is_referenced
+
+        def referenced_after_first_check(category_id):
+            # The first check passes just before a product is written.
+            if not products.count_documents({}):
+                products.insert_one({'id': 'late', 'category_id': category_id})
+                return False
+            return is_referenced(category_id)
+
+        products = mongo_config.get_collection('products')
+        with mock.patch.object(Category, 'is_referenced', side_effect=referenced_after_first_check):
+            with self.assertRaises(CategoryInUse):
+                Category.delete(self.category.id, mode='reject')
+        self.assertEqual(Category.get_by_id(self.category.id)['name'], 'Books')
+
+    def test_products_are_not_written_against_a_deleted_category(self):
+        # Still cached here after another worker deleted it.
+        self.assertIsNotNone(Category.get_by_id(self.category.id))
+        mongo_config.get_collection('categories').delete_one({'id': self.category.id})
+        with self.assertRaises(ValueError):
+            Product.create({'name': 'Emma', 'price': 5.0, 'category_id': self.category.id})
+        inserted, errors = Product.bulk_insert([Product({'name': 'Emma', 'category_id': self.category.id})])
+        self.assertEqual((inserted, errors), (0, [(0, 'Invalid category ID')]))
+        self.assertEqual([product['name'] for product in Product.get_all()], ['Dune'])
+
+    def test_nullify_and_cascade(self):
+        other = Category.create({'name': 'Comics'})
+        comic = Product.create({'name': 'Watchmen', 'price': 20.0, 'category_id': other.id})
+        self.assertEqual(Category.delete(self.category.id, mode='nullify')['released_references'], 1)
+        self.assertEqual(Product.get_by_id(self.product.id)['category_id'], '')
+        self.assertEqual(Category.delete(other.id, mode='cascade')['released_references'], 1)
+        self.assertIsNone(Product.get_by_id(comic.id))
+
+    def test_unknown_mode(self):
+        self.assertEqual(self.client.delete(f'/api/category/?id={self.category.id}&on_delete=orphan').status_code, 400)
+        self.assertEqual(self.client.delete(f'/api/category/?id={self.category.id}').status_code, 409)
+
+
+@override_settings(CATEGORY_CATALOG={'ENABLED': True, 'MAX_STALENESS': 60})
+class CategoryCatalogTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        self.category = Category.create({'name': 'Books'})
+
+    def names(self, **kwargs):
+        return sorted(category['name'] for category in Category.get_all(**kwargs))
+
+    def test_local_writes_are_applied_to_the_snapshot(self):
+        self.assertEqual(self.names(), ['Books'])
+        Category.create({'name': 'Toys'})
+        Category.update(self.category.id, {'name': 'Novels'})
+        Category.delete(self.category.id)
+        self.assertEqual(self.names(), ['Toys'])
+
+    def test_a_newer_collection_version_forces_a_reconcile(self):
+        # Written by another worker, with an updated_at the watermark misses.
+        self.assertEqual(self.names(version=CollectionVersion.get('categories')), ['Books'])
+        mongo_config.get_collection('categories').insert_one(
+            {'id': 'toys', 'name': 'Toys', 'version': 1, 'updated_at': datetime(2000, 1, 1)}
+        )
+        CollectionVersion.bump('categories')
+        self.assertEqual(self.names(), ['Books'])
+        self.assertEqual(self.names(version=CollectionVersion.get('categories')), ['Books', 'Toys'])
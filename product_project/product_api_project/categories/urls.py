@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import CategoryListView, CategoryDetailView
+from .views import CategoryListView, CategoryBatchView, CategoryDetailView
+from .async_views import AsyncCategoryListView, AsyncCategoryDetailView
 
 urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category-list'),
+    path('categories/batch/', CategoryBatchView.as_view(), name='category-batch'),
     path('category/', CategoryDetailView.as_view(), name='category-detail'),
+    path('async/categories/', AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('async/category/', AsyncCategoryDetailView.as_view(), name='async-category-detail'),
 ]
\ No newline at end of file
@@ -1,11 +1,12 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Category
+from .models import Category, CategoryInUse, CollectionVersion, DocumentNotFound, VersionConflict
 from .serializers import CategorySerializer
+from product_api.conditional import collection_etag, document_etag, expected_version, not_modified, set_validators
+from product_api.serializers import parse_fields, parse_ids, serialize
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class CategoryListView(APIView):
@@ -13,12 +14,20 @@ class CategoryListView(APIView):
         try:
             filters = {'name': request.query_params.get('name', '')}
             filters = {k: v for k, v in filters.items() if v}
-            logger.debug(f"GET filters: {filters}")
-            categories = Category.get_all(filters)
-            serializer = CategorySerializer(categories, many=True)
-            return Response(serializer.data)
+            logger.debug("GET filters: %s", filters)
+            try:
+                fields = parse_fields(request.query_params.get('fields'), CategorySerializer)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            version = CollectionVersion.get('categories')
+            etag = collection_etag(request, version)
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+            categories = Category.get_all(filters, fields=fields, version=version)
+            return set_validators(Response(serialize(CategorySerializer, categories, many=True, fields=fields)), etag)
         except Exception as e:
-            logger.error(f"Error in CategoryListView.get: {str(e)}")
+            logger.error("Error in CategoryListView.get: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def post(self, request):
@@ -27,15 +36,39 @@ class CategoryListView(APIView):
                 'name': request.query_params.get('name', ''),
                 'description': request.query_params.get('description', '')
             }
-            logger.debug(f"POST data: {data}")
+            logger.debug("POST data: %s", data)
             serializer = CategorySerializer(data=data)
             if serializer.is_valid():
                 category = serializer.save()
                 return Response(CategorySerializer(category).data, status=status.HTTP_201_CREATED)
-            logger.error(f"Serializer errors: {serializer.errors}")
+            logger.error("Serializer errors: %s", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error in CategoryListView.post: {str(e)}")
+            logger.error("Error in CategoryListView.post: %s", e)
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class CategoryBatchView(APIView):
+    def get(self, request):
+        return self.resolve(request, request.query_params.get('ids'))
+
+    def post(self, request):
+        return self.resolve(request, request.data.get('ids') if isinstance(request.data, dict) else None)
+
+    def resolve(self, request, ids):
+        try:
+            try:
+                ids = parse_ids(ids)
+                fields = parse_fields(request.query_params.get('fields'), CategorySerializer)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            logger.debug("Batch category ids: %s", ids)
+            found = Category.get_many(ids)
+            return Response({
+                'results': serialize(CategorySerializer, [found[i] for i in ids if i in found], many=True, fields=fields),
+                'missing': [category_id for category_id in ids if category_id not in found],
+            })
+        except Exception as e:
+            logger.error("Error in CategoryBatchView: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CategoryDetailView(APIView):
@@ -44,14 +77,22 @@ class CategoryDetailView(APIView):
             category_id = request.query_params.get('id')
             if not category_id:
                 return Response({'error': 'Category ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            logger.debug(f"GET category_id: {category_id}")
+            logger.debug("GET category_id: %s", category_id)
+            try:
+                fields = parse_fields(request.query_params.get('fields'), CategorySerializer)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            # Served from the category cache, so revalidation skips Mongo too.
             category = Category.get_by_id(category_id)
             if not category:
                 return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
-            serializer = CategorySerializer(category)
-            return Response(serializer.data)
+            etag = document_etag(request, category)
+            response = not_modified(request, etag, category.get('updated_at'))
+            if response is not None:
+                return response
+            return set_validators(Response(serialize(CategorySerializer, category, fields=fields)), etag, category.get('updated_at'))
         except Exception as e:
-            logger.error(f"Error in CategoryDetailView.get: {str(e)}")
+            logger.error("Error in CategoryDetailView.get: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def put(self, request):
@@ -59,22 +100,25 @@ class CategoryDetailView(APIView):
             category_id = request.query_params.get('id')
             if not category_id:
                 return Response({'error': 'Category ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            category = Category.get_by_id(category_id)
-            if not category:
-                return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
-            data = {
-                'name': request.query_params.get('name', category['name']),
-                'description': request.query_params.get('description', category['description'])
-            }
-            logger.debug(f"PUT data: {data}")
-            serializer = CategorySerializer(category, data=data, partial=True)
-            if serializer.is_valid():
+            try:
+                version = expected_version(request)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            data = {name: request.query_params.get(name) for name in ('name', 'description') if name in request.query_params}
+            logger.debug("PUT data: %s", data)
+            serializer = CategorySerializer({'id': category_id}, data=data, partial=True, context={'expected_version': version})
+            if not serializer.is_valid():
+                logger.error("Serializer errors: %s", serializer.errors)
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            try:
                 updated_category = serializer.save()
-                return Response(CategorySerializer(updated_category).data)
-            logger.error(f"Serializer errors: {serializer.errors}")
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            except DocumentNotFound:
+                return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+            except VersionConflict as e:
+                return Response({'error': str(e), 'version': e.current_version}, status=status.HTTP_412_PRECONDITION_FAILED)
+            return Response(CategorySerializer(updated_category).data)
         except Exception as e:
-            logger.error(f"Error in CategoryDetailView.put: {str(e)}")
+            logger.error("Error in CategoryDetailView.put: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def delete(self, request):
@@ -82,12 +126,18 @@ class CategoryDetailView(APIView):
             category_id = request.query_params.get('id')
             if not category_id:
                 return Response({'error': 'Category ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            logger.debug(f"DELETE category_id: {category_id}")
-            category = Category.get_by_id(category_id)
-            if not category:
+            logger.debug("DELETE category_id: %s", category_id)
+            try:
+                Category.delete(category_id, expected_version=expected_version(request), mode=request.query_params.get('on_delete'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except CategoryInUse as e:
+                return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+            except DocumentNotFound:
                 return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
-            Category.delete(category_id)
+            except VersionConflict as e:
+                return Response({'error': str(e), 'version': e.current_version}, status=status.HTTP_412_PRECONDITION_FAILED)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
-            logger.error(f"Error in CategoryDetailView.delete: {str(e)}")
+            logger.error("Error in CategoryDetailView.delete: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
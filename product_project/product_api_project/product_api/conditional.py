@@ -0,0 +1,90 @@
+"""
+HTTP conditional requests (ETag / Last-Modified) for the catalog reads.
+
+Detail responses are validated by the document's ``version`` and
+``updated_at``; list responses by the collection's ``CollectionVersion``.
+Both also cover the path, query string and output format, which shape the
+body. Views compute the validators before loading or serializing anything,
+so a matching ``If-None-Match`` / ``If-Modified-Since`` is answered with a
+304 after a version lookup alone.
+
+Document tags start with the version they were computed from, so writes can
+send one back in ``If-Match`` (or pass ``?version=``) for an optimistic
+concurrency check without the server reading the document first.
+"""
+
+import calendar
+import hashlib
+import re
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Added to sparse-fieldset projections so detail views can always tag the body.
+VALIDATOR_FIELDS = ('version', 'updated_at')
+
+
+_VERSION_TAG = re.compile(r'^(?:W/)?"(\d+)\.[0-9a-f]+"$')
+
+
+def make_etag(*parts, prefix=None):
+    # Weak: the same version may be sent compressed or not.
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=8).hexdigest()
+    return f'W/"{prefix}.{digest}"' if prefix is not None else f'W/"{digest}"'
+
+
+def timestamp(value):
+    # Mongo hands back naive UTC datetimes.
+    return calendar.timegm(value.utctimetuple()) if value else None
+
+
+def is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def _representation(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return request.path, renderer.format if renderer else 'json', sorted(request.GET.lists())
+
+
+def document_etag(request, document):
+    version = document.get('version') or 0
+    return make_etag(*_representation(request), version, timestamp(document.get('updated_at')), prefix=version)
+
+
+def collection_etag(request, version):
+    return make_etag(*_representation(request), version)
+
+
+def expected_version(request):
+    # The version a write is conditioned on: ``?version=`` or a document tag
+    # in If-Match. None means unconditional (``If-Match: *`` included).
+    value = request.GET.get('version')
+    if value not in (None, ''):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError('version must be an integer')
+    header = request.META.get('HTTP_IF_MATCH', '').strip()
+    if not header or header == '*':
+        return None
+    match = _VERSION_TAG.match(header)
+    if not match:
+        raise ValueError('If-Match must be an ETag from a detail response')
+    return int(match.group(1))
+
+
+def set_validators(response, etag, last_modified=None):
+    response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(timestamp(last_modified))
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    # The 304 (or 412) response when the client's validators decide the
+    # request, otherwise None.
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp(last_modified))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
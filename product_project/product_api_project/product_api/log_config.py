@@ -0,0 +1,92 @@
+"""
+Logging helpers referenced from ``LOGGING`` in settings.
+
+Request threads only put records on a bounded in-memory queue; a background
+``QueueListener`` thread formats them and writes them to the stream, so a slow
+log sink never blocks a request.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import weakref
+
+PLAIN_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+_handlers = weakref.WeakSet()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that owns its QueueListener and the stream handler behind it.
+
+    When the queue is full records are dropped (and counted) rather than
+    blocking the caller.
+    """
+
+    def __init__(self, json_format=True, stream=None, queue_size=10000):
+        self.target = logging.StreamHandler(stream)
+        self.target.setFormatter(JSONFormatter() if json_format else logging.Formatter(PLAIN_FORMAT))
+        self.queue_size = queue_size
+        self.dropped = 0
+        super().__init__(queue.Queue(queue_size))
+        self.listener = None
+        self.start()
+        _handlers.add(self)
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def restart_after_fork(self):
+        # The listener thread does not survive fork; give the child its own.
+        self.queue = queue.Queue(self.queue_size)
+        self.start()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+
+def _stop_listeners():
+    for handler in list(_handlers):
+        handler.close()
+
+
+def _restart_listeners():
+    for handler in list(_handlers):
+        handler.restart_after_fork()
+
+
+atexit.register(_stop_listeners)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listeners)
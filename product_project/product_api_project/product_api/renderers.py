@@ -0,0 +1,29 @@
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """Serialize ``data`` to a JSON ``str`` with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_fallback_encoder.default).decode('utf-8')
+    return json.dumps(data, cls=JSONEncoder, separators=(',', ':'))
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer that encodes with orjson, falling back to the stdlib encoder."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # orjson only knows a 2-space indent; indented output (the browsable
+        # API, ``Accept: application/json; indent=4``) goes through DRF.
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_fallback_encoder.default)
@@ -0,0 +1,144 @@
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.fields import empty
+
+_SKIP = object()
+
+
+def _converter(field):
+    # Exact types only: subclasses may override to_representation.
+    converters = {
+        serializers.CharField: str,
+        serializers.FloatField: float,
+        serializers.IntegerField: int,
+        serializers.BooleanField: bool,
+    }
+    return converters.get(type(field), field.to_representation)
+
+
+class FastReader:
+    """
+    Read-only serializer for flat Mongo documents.
+
+    Per-field converters are compiled once from a DRF serializer, so a row is
+    mapped with a single loop instead of DRF's per-field get_attribute /
+    to_representation machinery. Missing keys follow DRF: the field default
+    is used when there is one, otherwise the field is left out. Fields listed
+    in the serializer's ``OMIT_IF_NONE`` are left out when None, as
+    ``DynamicFieldsMixin.to_representation`` does.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        self.plan = []
+        omit_if_none = getattr(serializer_class, 'OMIT_IF_NONE', ())
+        for name, field in serializer_class(fields=fields).fields.items():
+            if field.write_only:
+                continue
+            default = field.default if field.default is not empty else _SKIP
+            self.plan.append((name, field.source, _converter(field), default, name in omit_if_none))
+
+    def to_representation(self, document):
+        data = {}
+        for name, source, convert, default, omit_if_none in self.plan:
+            value = document.get(source, _SKIP)
+            if value is _SKIP:
+                if default is _SKIP:
+                    continue
+                value = default() if callable(default) else default
+            if value is None:
+                if not omit_if_none:
+                    data[name] = None
+                continue
+            data[name] = convert(value)
+        return data
+
+    def many(self, documents):
+        to_representation = self.to_representation
+        return [to_representation(document) for document in documents]
+
+
+@lru_cache(maxsize=256)
+def _reader(serializer_class, fields):
+    return FastReader(serializer_class, fields=fields)
+
+
+class DynamicFieldsMixin:
+    """Serializer mixin taking a ``fields`` kwarg that limits the output fields."""
+
+    # Output fields dropped, rather than rendered as null, when None.
+    OMIT_IF_NONE = ()
+
+    @classmethod
+    def reader(cls, fields=None):
+        # ``fields`` comes from the query string: the cache key is the sorted
+        # set of known names (output order follows the serializer anyway), so
+        # reorderings and repeats share a reader, and the cache is bounded.
+        if fields:
+            known = cls._declared_fields
+            unknown = [name for name in fields if name not in known]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            fields = tuple(sorted(set(fields)))
+        return _reader(cls, fields or None)
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in self.OMIT_IF_NONE:
+            if name in data and data[name] is None:
+                del data[name]
+        return data
+
+
+def parse_fields(value, serializer_class):
+    # ``fields=id,name,price`` -> ['id', 'name', 'price']; None when absent.
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in serializer_class().fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_ids(value, maximum=None):
+    # Accepts ``a,b,c`` or a list; keeps the first occurrence of each id.
+    if isinstance(value, str):
+        value = value.split(',')
+    ids = list(dict.fromkeys(str(item).strip() for item in (value or []) if str(item).strip()))
+    if not ids:
+        raise ValueError('ids is required')
+    maximum = maximum or getattr(settings, 'BATCH_MAX_IDS', 500)
+    if len(ids) > maximum:
+        raise ValueError(f'At most {maximum} ids per request')
+    return ids
+
+
+# Internal fields stored on documents but never returned to clients
+# (the name search index, see categories/search.py).
+HIDDEN_FIELDS = ('name_lower', 'name_grams')
+
+
+def projection(fields=None, required=()):
+    # Mongo projection matching a sparse fieldset; ``_id`` and the hidden
+    # fields are never returned.
+    if not fields:
+        return {'_id': 0, **{name: 0 for name in HIDDEN_FIELDS}}
+    return {'_id': 0, **{name: 1 for name in (*fields, *required)}}
+
+
+def serialize(serializer_class, instance, many=False, fields=None):
+    # Read path used by the GET views: the precompiled FastReader when
+    # FAST_READ_SERIALIZERS is on, otherwise the regular DRF serializer.
+    if getattr(settings, 'FAST_READ_SERIALIZERS', False):
+        reader = serializer_class.reader(fields)
+        return reader.many(instance) if many else reader.to_representation(instance)
+    return serializer_class(instance, many=many, fields=fields).data
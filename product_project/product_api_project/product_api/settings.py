@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'mongo_common.metrics.MetricsMiddleware',
+    'mongo_common.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,13 +86,158 @@ DATABASES = {
 
 MONGO_URI = 'mongodb://localhost:27017/product_db'
 MONGO_DB_NAME = 'product_db'
+# Client options, see mongo_common/mongo_config.py. Each worker process builds
+# its own client after fork; None leaves the PyMongo default in place.
+MONGO_MAX_POOL_SIZE = 100
+MONGO_MIN_POOL_SIZE = 0
+MONGO_MAX_IDLE_TIME_MS = 60000
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+MONGO_CONNECT_TIMEOUT_MS = 5000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+MONGO_SOCKET_TIMEOUT_MS = None
+MONGO_READ_PREFERENCE = 'primary'
+MONGO_WRITE_CONCERN = {'w': 1}
+MONGO_COMPRESSORS = None  # e.g. 'zstd,snappy,zlib'
+# Build the declared indexes when each worker handles its first request
+# (not at import, so manage.py commands never wait on MongoDB), in a
+# background thread. A failed build is retried by a later request at most
+# every MONGO_STARTUP_RETRY_INTERVAL seconds. To build them at deploy time
+# with manage.py ensure_indexes instead, set this to False.
+MONGO_ENSURE_INDEXES_ON_STARTUP = True
+MONGO_STARTUP_RETRY_INTERVAL = 30.0
+# Also explain() every declared query shape then and log an error for any
+# COLLSCAN (manage.py ensure_indexes does the same and fails instead).
+MONGO_VERIFY_QUERY_PLANS_ON_STARTUP = False
+# Threads available to the async views for blocking PyMongo calls.
+MONGO_ASYNC_WORKERS = 32
+
+# Read-through cache for Category.get_by_id. BACKEND is 'local' (per-process
+# LRU), 'django' (the CACHES alias named by ALIAS) or None to disable. For
+# TOMBSTONE_TTL seconds after a write the category is not cached again, so a
+# read that started before it cannot cache the old document (see
+# mongo_common/cache.py).
+CATEGORY_CACHE = {
+    'BACKEND': 'local',
+    'MAX_SIZE': 1024,
+    'TTL': 300,
+    'TOMBSTONE_TTL': 5,
+    'ALIAS': 'default',
+}
+
+# In-memory category catalog (see categories/catalog.py). When ENABLED,
+# each worker loads every category at startup and Category.get_by_id,
+# get_many and get_all (so CategoryListView and product category checks)
+# read from it. A read more than MAX_STALENESS seconds after the last
+# refresh fetches the categories updated since then (allowing
+# WATERMARK_OVERLAP seconds of clock skew between writers) and drops
+# deleted ones; FULL_RELOAD_INTERVAL seconds apart it reloads everything.
+CATEGORY_CATALOG = {
+    'ENABLED': False,
+    'MAX_STALENESS': 5.0,
+    'WATERMARK_OVERLAP': 5.0,
+    'FULL_RELOAD_INTERVAL': 600,
+}
+
+# Invalidate CATEGORY_CACHE entries from a MongoDB change stream, so every
+# worker drops entries written by other workers or outside the API (see
+# mongo_common/changestreams.py). Needs a replica set. Each worker follows
+# the stream from its own start, since the catalog and a local cache are its
+# own; consumers of shared state elect one worker by a LEASE_TTL-second lease
+# in MONGO_CHANGE_STREAM_TOKENS_COLLECTION, where it keeps the resume token.
+# With the stream running, the cache TTL only bounds staleness while the
+# stream is down.
+MONGO_CHANGE_STREAMS = False
+MONGO_CHANGE_STREAM_TOKENS_COLLECTION = 'change_stream_tokens'
+MONGO_CHANGE_STREAM_TOKEN_SAVE_INTERVAL = 1.0
+MONGO_CHANGE_STREAM_MAX_AWAIT_MS = 1000
+MONGO_CHANGE_STREAM_RETRY_INTERVAL = 5.0
+MONGO_CHANGE_STREAM_LEASE_TTL = 10.0
+
+# What DELETE /api/category/ does with products still pointing at the
+# category: 'reject' (409), 'nullify' (clear their category_id) or 'cascade'
+# (delete them). Overridable per request with ?on_delete=.
+CATEGORY_DELETE_MODE = 'reject'
+
+# Store a copy of the category name on each product (category_name), kept in
+# sync by Category.update. Run manage.py backfill_category_names after
+# turning it on for existing data.
+PRODUCT_DENORMALIZE_CATEGORY_NAME = False
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Aggregated product stats (GET /api/products/stats/), cached per collection version
+PRODUCT_STATS_CACHE_ALIAS = 'default'
+PRODUCT_STATS_CACHE_TTL = 600
+
+# Keyset pagination for list endpoints (?limit=&cursor=)
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Batched multi-get endpoints (/api/products/batch/, /api/categories/batch/)
+BATCH_MAX_IDS = 500
+
+# Bulk product ingestion (POST /api/products/bulk/, manage.py import_products)
+BULK_CHUNK_SIZE = 1000
+BULK_MAX_REPORTED_ERRORS = 1000
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'product_api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Serve GET responses through the precompiled FastReader instead of the DRF
+# serializer field machinery (see product_api/serializers.py).
+FAST_READ_SERIALIZERS = False
+
+# Response compression (see mongo_common/compression.py). Encodings in server
+# preference order; zstd and br are used when the zstandard / brotli packages
+# are installed. Bodies smaller than COMPRESSION_MIN_SIZE bytes go out as is;
+# streamed responses are flushed every COMPRESSION_STREAM_FLUSH_SIZE bytes.
+COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_STREAM_FLUSH_SIZE = 16384
+
+# Logging
+# Records go through a bounded queue to a background writer thread
+# (product_api/log_config.py). LOG_LEVEL = 'DEBUG' enables per-request
+# debug logs; at INFO they are skipped before any formatting happens.
+LOG_LEVEL = 'INFO'
+LOG_JSON = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'queue': {
+            '()': 'product_api.log_config.NonBlockingQueueHandler',
+            'json_format': LOG_JSON,
+            'stream': 'ext://sys.stderr',
+            'queue_size': 10000,
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        'django': {
+            'level': LOG_LEVEL,
+            'propagate': True,
+        },
+    },
 }
 
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
+from mongo_common.views import metrics, mongo_pool_stats
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('products.urls')),  # Routes for products
     path('api/', include('categories.urls')),  # Routes for categories
+    path('api/mongo/pool-stats/', mongo_pool_stats, name='mongo-pool-stats'),
+    path('metrics', metrics, name='metrics'),
 ]
\ No newline at end of file
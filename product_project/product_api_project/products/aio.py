@@ -0,0 +1,46 @@
+from itertools import islice
+
+from categories.aio import run_blocking
+from .models import Product
+
+
+class AsyncProduct:
+    @staticmethod
+    async def create(product_data):
+        return await run_blocking(Product.create, product_data)
+
+    @staticmethod
+    async def get_all(filters=None, fields=None, sort=None):
+        return await run_blocking(Product.get_all, filters, fields=fields, sort=sort)
+
+    @staticmethod
+    async def iter_all(filters=None, batch_size=1000, fields=None, sort=None):
+        # Each batch is pulled from the cursor on the I/O pool, so the event
+        # loop never waits on a getMore.
+        documents = await run_blocking(Product.iter_all, filters, batch_size=batch_size, fields=fields, sort=sort)
+        while True:
+            batch = await run_blocking(list, islice(documents, batch_size))
+            if not batch:
+                return
+            for document in batch:
+                yield document
+
+    @staticmethod
+    async def get_page(filters=None, after=None, limit=50, fields=None, sort='id'):
+        return await run_blocking(Product.get_page, filters, after=after, limit=limit, fields=fields, sort=sort)
+
+    @staticmethod
+    async def get_by_id(product_id, fields=None, required=()):
+        return await run_blocking(Product.get_by_id, product_id, fields=fields, required=required)
+
+    @staticmethod
+    async def get_version(product_id):
+        return await run_blocking(Product.get_version, product_id)
+
+    @staticmethod
+    async def update(product_id, data, expected_version=None):
+        return await run_blocking(Product.update, product_id, data, expected_version=expected_version)
+
+    @staticmethod
+    async def delete(product_id, expected_version=None):
+        return await run_blocking(Product.delete, product_id, expected_version=expected_version)
@@ -1,5 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'products'
\ No newline at end of file
+    name = 'products'
+
+    def ready(self):
+        from mongo_common.mongo_config import on_first_request
+        on_first_request(self.prepare, dispatch_uid='products.prepare')
+
+    def prepare(self):
+        if not getattr(settings, 'MONGO_ENSURE_INDEXES_ON_STARTUP', True):
+            return
+        from .models import Product
+        from mongo_common.indexes import log_bad_plans, verify_query_plans
+        Product.ensure_indexes()
+        if getattr(settings, 'MONGO_VERIFY_QUERY_PLANS_ON_STARTUP', False):
+            log_bad_plans(verify_query_plans(Product.query_shapes()))
@@ -0,0 +1,155 @@
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from categories.aio import run_blocking, save_serializer
+from categories.models import CollectionVersion, DocumentNotFound, VersionConflict
+from .aio import AsyncProduct
+from .models import SORTS
+from .pagination import STREAM_FORMATS, decode_cursor, encode_cursor, parse_limit, parse_sort, streaming_response
+from .serializers import ProductSerializer
+from product_api.conditional import (
+    VALIDATOR_FIELDS, collection_etag, document_etag, expected_version, is_conditional, not_modified, set_validators
+)
+from product_api.serializers import parse_fields, serialize
+from functools import partial
+import logging
+
+logger = logging.getLogger(__name__)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncProductListView(View):
+    async def get(self, request):
+        try:
+            filters = {
+                'name': request.GET.get('name', ''),
+                'category_id': request.GET.get('category_id', ''),
+                'min_price': request.GET.get('min_price', ''),
+                'max_price': request.GET.get('max_price', '')
+            }
+            filters = {k: v for k, v in filters.items() if v}
+            logger.debug("GET filters: %s", filters)
+            try:
+                fields = parse_fields(request.GET.get('fields'), ProductSerializer)
+                sort = parse_sort(request.GET.get('sort'), SORTS)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            etag = collection_etag(request, await run_blocking(CollectionVersion.get, 'products'))
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+            stream_format = request.GET.get('stream')
+            if stream_format:
+                if stream_format not in STREAM_FORMATS:
+                    return JsonResponse({'error': f"stream must be one of: {', '.join(STREAM_FORMATS)}"}, status=400)
+                represent = partial(serialize, ProductSerializer, fields=fields)
+                return set_validators(streaming_response(AsyncProduct.iter_all(filters, fields=fields, sort=sort), represent, stream_format), etag)
+            if 'limit' in request.GET or 'cursor' in request.GET:
+                try:
+                    limit = parse_limit(request.GET.get('limit'))
+                    after = decode_cursor(request.GET.get('cursor'), sort or 'id', SORTS)
+                except ValueError as e:
+                    return JsonResponse({'error': str(e)}, status=400)
+                products, position = await AsyncProduct.get_page(filters, after=after, limit=limit, fields=fields, sort=sort)
+                return set_validators(JsonResponse({
+                    'results': serialize(ProductSerializer, products, many=True, fields=fields),
+                    'next_cursor': encode_cursor(position, sort or 'id'),
+                }), etag)
+            products = await AsyncProduct.get_all(filters, fields=fields, sort=sort)
+            return set_validators(JsonResponse(serialize(ProductSerializer, products, many=True, fields=fields), safe=False), etag)
+        except Exception as e:
+            logger.error("Error in AsyncProductListView.get: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+    async def post(self, request):
+        try:
+            data = {
+                'name': request.GET.get('name', ''),
+                'price': float(request.GET.get('price', 0.0)) if request.GET.get('price') else 0.0,
+                'category_id': request.GET.get('category_id', ''),
+                'description': request.GET.get('description', '')
+            }
+            logger.debug("POST data: %s", data)
+            product, errors = await save_serializer(ProductSerializer(data=data))
+            if errors:
+                logger.error("Serializer errors: %s", errors)
+                return JsonResponse(errors, status=400)
+            return JsonResponse(ProductSerializer(product).data, status=201)
+        except Exception as e:
+            logger.error("Error in AsyncProductListView.post: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncProductDetailView(View):
+    async def get(self, request):
+        try:
+            product_id = request.GET.get('id')
+            if not product_id:
+                return JsonResponse({'error': 'Product ID is required'}, status=400)
+            logger.debug("GET product_id: %s", product_id)
+            try:
+                fields = parse_fields(request.GET.get('fields'), ProductSerializer)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            if is_conditional(request):
+                current = await AsyncProduct.get_version(product_id)
+                if not current:
+                    return JsonResponse({'error': 'Product not found'}, status=404)
+                response = not_modified(request, document_etag(request, current), current.get('updated_at'))
+                if response is not None:
+                    return response
+            product = await AsyncProduct.get_by_id(product_id, fields=fields, required=VALIDATOR_FIELDS)
+            if not product:
+                return JsonResponse({'error': 'Product not found'}, status=404)
+            response = JsonResponse(serialize(ProductSerializer, product, fields=fields))
+            return set_validators(response, document_etag(request, product), product.get('updated_at'))
+        except Exception as e:
+            logger.error("Error in AsyncProductDetailView.get: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+    async def put(self, request):
+        try:
+            product_id = request.GET.get('id')
+            if not product_id:
+                return JsonResponse({'error': 'Product ID is required'}, status=400)
+            try:
+                version = expected_version(request)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            data = {name: request.GET.get(name) for name in ('name', 'category_id', 'description') if name in request.GET}
+            if request.GET.get('price'):
+                data['price'] = request.GET.get('price')
+            logger.debug("PUT data: %s", data)
+            serializer = ProductSerializer({'id': product_id}, data=data, partial=True, context={'expected_version': version})
+            try:
+                updated_product, errors = await save_serializer(serializer)
+            except DocumentNotFound:
+                return JsonResponse({'error': 'Product not found'}, status=404)
+            except VersionConflict as e:
+                return JsonResponse({'error': str(e), 'version': e.current_version}, status=412)
+            if errors:
+                logger.error("Serializer errors: %s", errors)
+                return JsonResponse(errors, status=400)
+            return JsonResponse(ProductSerializer(updated_product).data)
+        except Exception as e:
+            logger.error("Error in AsyncProductDetailView.put: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+    async def delete(self, request):
+        try:
+            product_id = request.GET.get('id')
+            if not product_id:
+                return JsonResponse({'error': 'Product ID is required'}, status=400)
+            logger.debug("DELETE product_id: %s", product_id)
+            try:
+                await AsyncProduct.delete(product_id, expected_version=expected_version(request))
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            except DocumentNotFound:
+                return JsonResponse({'error': 'Product not found'}, status=404)
+            except VersionConflict as e:
+                return JsonResponse({'error': str(e), 'version': e.current_version}, status=412)
+            return HttpResponse(status=204)
+        except Exception as e:
+            logger.error("Error in AsyncProductDetailView.delete: %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
@@ -0,0 +1,55 @@
+from django.conf import settings
+
+from categories.models import Category, denormalize_category_name
+from mongo_common.bulk import BULK_FORMATS, chunks, parse
+from .models import Product
+from .serializers import ProductSerializer
+
+
+def ingest(rows, chunk_size=None):
+    """Validate and insert ``(row_number, data, parse_error)`` tuples chunk by chunk."""
+    chunk_size = chunk_size or getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+    max_errors = getattr(settings, 'BULK_MAX_REPORTED_ERRORS', 1000)
+    summary = {'received': 0, 'inserted': 0, 'error_count': 0, 'errors': []}
+
+    def report(row_number, errors):
+        summary['error_count'] += 1
+        if len(summary['errors']) < max_errors:
+            summary['errors'].append({'row': row_number, 'errors': errors})
+
+    for chunk in chunks(rows, chunk_size):
+        valid = []
+        for row_number, data, parse_error in chunk:
+            summary['received'] += 1
+            if parse_error:
+                report(row_number, parse_error)
+                continue
+            serializer = ProductSerializer(data=data, context={'validate_category': False})
+            if not serializer.is_valid():
+                report(row_number, serializer.errors)
+                continue
+            valid.append((row_number, serializer.validated_data))
+
+        category_ids = [data['category_id'] for _, data in valid if data.get('category_id')]
+        if denormalize_category_name():
+            categories = Category.get_many(category_ids)
+            existing = set(categories)
+        else:
+            existing = Category.get_existing_ids(category_ids)
+        row_numbers = []
+        products = []
+        for row_number, data in valid:
+            if data.get('category_id') and data['category_id'] not in existing:
+                report(row_number, {'category_id': ['Invalid category ID']})
+                continue
+            row_numbers.append(row_number)
+            product = Product(data)
+            if denormalize_category_name():
+                product.category_name = categories[data['category_id']]['name'] if data.get('category_id') else ''
+            products.append(product)
+
+        inserted, write_errors = Product.bulk_insert(products)
+        summary['inserted'] += inserted
+        for index, message in write_errors:
+            report(row_numbers[index], message)
+    return summary
@@ -0,0 +1,49 @@
+"""
+Referential-integrity scan for product category ids.
+
+Orphans are products whose ``category_id`` names a category that no longer
+exists, e.g. written concurrently with a category delete, or before delete
+modes existed. The scan walks the distinct category ids in index order (the
+``$sort`` + ``$group`` pair runs as a DISTINCT_SCAN over the category_id
+index, reading one key per category rather than every product), checks each
+batch against the categories collection with one ``$in`` query, and can
+repair the orphans of each batch with a single update_many / delete_many.
+"""
+
+from categories.models import Category, MongoDBConnection
+
+
+def iter_referenced_category_ids(batch_size=1000):
+    pipeline = [
+        {'$sort': {'category_id': 1}},
+        {'$group': {'_id': '$category_id'}},
+    ]
+    batch = []
+    for group in MongoDBConnection.get_collection('products').aggregate(pipeline, batchSize=batch_size):
+        if group['_id'] in (None, ''):
+            continue
+        batch.append(group['_id'])
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def scan_orphans(batch_size=1000, fix=None):
+    # ``fix`` is None (report only), 'nullify' or 'cascade'.
+    categories = MongoDBConnection.get_collection('categories')
+    products = MongoDBConnection.get_collection('products')
+    summary = {'category_ids_scanned': 0, 'orphaned_category_ids': [], 'orphaned_products': 0, 'fixed': 0}
+    for batch in iter_referenced_category_ids(batch_size):
+        # Straight from Mongo: a cached category may already be deleted.
+        existing = {category['id'] for category in categories.find({'id': {'$in': batch}}, {'_id': 0, 'id': 1})}
+        orphans = [category_id for category_id in batch if category_id not in existing]
+        summary['category_ids_scanned'] += len(batch)
+        if not orphans:
+            continue
+        summary['orphaned_category_ids'].extend(orphans)
+        summary['orphaned_products'] += products.count_documents({'category_id': {'$in': orphans}})
+        if fix:
+            summary['fixed'] += Category.release_references(orphans, fix)
+    return summary
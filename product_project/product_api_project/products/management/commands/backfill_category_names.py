@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from categories.models import Category, MongoDBConnection
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy each category name onto its products (category_name), one update_many per category. '
+        'Run after enabling PRODUCT_DENORMALIZE_CATEGORY_NAME.'
+    )
+
+    def handle(self, *args, **options):
+        updated = 0
+        categories = MongoDBConnection.get_collection('categories').find({}, {'_id': 0, 'id': 1, 'name': 1})
+        for category in categories:
+            updated += Category.propagate_name(category['id'], category.get('name', ''))
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} products'))
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.test import AsyncClient
+from django.test.utils import override_settings
+
+from mongo_common.benchmarking import percentile
+from products.models import Product
+
+
+async def _drive(path, total, concurrency):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    return {
+        'path': path,
+        'requests': total,
+        'concurrency': concurrency,
+        'statuses': statuses,
+        'requests_per_second': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare the sync and async product endpoints under concurrent load through the ASGI handler.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--product-id', help='Product to fetch; defaults to any existing product')
+
+    def handle(self, *args, **options):
+        product_id = options['product_id']
+        if not product_id:
+            products, _ = Product.get_page(limit=1)
+            if not products:
+                raise CommandError('No products found; seed the database or pass --product-id')
+            product_id = products[0]['id']
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for prefix in ('', 'async/'):
+                path = f'/api/{prefix}product/?id={product_id}'
+                results.append(asyncio.run(_drive(path, options['requests'], options['concurrency'])))
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,106 @@
+import json
+import random
+import time
+import uuid
+import zlib
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from mongo_common import compression
+from product_api.renderers import dumps
+
+WORDS = (
+    'steel oak linen cotton wool glass ceramic leather walnut maple copper brass '
+    'compact large small portable wireless classic modern vintage premium eco '
+    'lamp chair table shelf mug kettle blanket speaker cable charger bottle desk'
+).split()
+
+
+def _products(count, seed=0):
+    rng = random.Random(seed)
+    category_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(20)]
+    return [{
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'name': ' '.join(rng.choices(WORDS, k=3)).title(),
+        'price': round(rng.uniform(1, 1000), 2),
+        'category_id': rng.choice(category_ids),
+        'description': ' '.join(rng.choices(WORDS, k=rng.randint(5, 25))),
+    } for _ in range(count)]
+
+
+def _decompressor(name):
+    if name == 'gzip':
+        return lambda data: zlib.decompress(data, 31)
+    if name == 'br':
+        return compression.brotli.decompress
+    return lambda data: compression.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def _best(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure compression ratio and CPU time per encoding on synthetic product list '
+        'payloads, and the resulting time on the wire at the given bandwidths (no database needed).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='100,1000,10000', help='Comma-separated row counts')
+        parser.add_argument('--levels', help='Comma-separated encoding:level pairs, e.g. gzip:1,gzip:6,br:4 (default: COMPRESSION_LEVELS)')
+        parser.add_argument('--bandwidth-mbps', default='10,100', help='Comma-separated link speeds for the wire-time estimate')
+        parser.add_argument('--repeat', type=int, default=3, help='Best-of-N timing')
+
+    def handle(self, *args, **options):
+        if options['levels']:
+            variants = []
+            for pair in options['levels'].split(','):
+                name, _, level = pair.partition(':')
+                if name not in compression.CODECS:
+                    raise CommandError(f"Unknown or unavailable encoding: {name} (available: {', '.join(compression.CODECS)})")
+                variants.append(compression.CODECS[name](int(level) if level else compression.DEFAULT_LEVELS[name]))
+        else:
+            variants = list(compression.available_codecs(getattr(settings, 'COMPRESSION_LEVELS', None)).values())
+        bandwidths = [float(value) for value in options['bandwidth_mbps'].split(',')]
+        flush_size = getattr(settings, 'COMPRESSION_STREAM_FLUSH_SIZE', 16384)
+
+        def wire_ms(size):
+            return {f'{mbps:g}mbps': round(size * 8 / (mbps * 1e6) * 1000, 2) for mbps in bandwidths}
+
+        results = []
+        for rows in [int(n) for n in options['rows'].split(',')]:
+            documents = _products(rows)
+            body = dumps(documents).encode('utf-8')
+            lines = [(dumps(document) + '\n').encode('utf-8') for document in documents]
+            results.append({'rows': rows, 'encoding': 'identity', 'bytes': len(body), 'wire_ms': wire_ms(len(body))})
+            for codec in variants:
+                compress_seconds, compressed = _best(lambda: codec.compress(body), options['repeat'])
+                decompress_seconds, _ = _best(lambda: _decompressor(codec.name)(compressed), options['repeat'])
+                streamed = b''.join(compression.compress_stream(lines, codec, flush_size))
+                compress_ms = compress_seconds * 1000
+                decompress_ms = decompress_seconds * 1000
+                results.append({
+                    'rows': rows,
+                    'encoding': codec.name,
+                    'level': codec.level,
+                    'bytes': len(compressed),
+                    'ratio': round(len(body) / len(compressed), 2),
+                    'streamed_ndjson_ratio': round(sum(map(len, lines)) / len(streamed), 2),
+                    'compress_ms': round(compress_ms, 2),
+                    'decompress_ms': round(decompress_ms, 2),
+                    'compress_mb_per_s': round(len(body) / 1e6 / compress_seconds, 1) if compress_seconds else None,
+                    'wire_ms': wire_ms(len(compressed)),
+                    'total_ms': {
+                        key: round(compress_ms + value + decompress_ms, 2)
+                        for key, value in wire_ms(len(compressed)).items()
+                    },
+                })
+        self.stdout.write(json.dumps(results, indent=2))
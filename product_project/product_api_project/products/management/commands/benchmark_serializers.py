@@ -0,0 +1,63 @@
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from categories.serializers import CategorySerializer
+from product_api.renderers import ORJSONRenderer
+from products.serializers import ProductSerializer
+
+
+def _products(count):
+    category_ids = [str(uuid.uuid4()) for _ in range(20)]
+    return [{
+        'id': str(uuid.uuid4()),
+        'name': f'Product {i}',
+        'price': float(i % 1000) + 0.99,
+        'category_id': category_ids[i % len(category_ids)],
+        'description': 'Lorem ipsum dolor sit amet ' * 4,
+    } for i in range(count)]
+
+
+def _categories(count):
+    return [{
+        'id': str(uuid.uuid4()),
+        'name': f'Category {i}',
+        'description': 'Lorem ipsum dolor sit amet',
+    } for i in range(count)]
+
+
+def _time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF serializer + JSONRenderer against FastReader + ORJSONRenderer on synthetic rows (no database needed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000', help='Comma-separated row counts')
+        parser.add_argument('--repeat', type=int, default=3, help='Best-of-N timing')
+
+    def handle(self, *args, **options):
+        results = []
+        for rows in [int(n) for n in options['rows'].split(',')]:
+            for serializer_class, documents in ((ProductSerializer, _products(rows)), (CategorySerializer, _categories(rows))):
+                reader = serializer_class.reader()
+                drf = _time(lambda: JSONRenderer().render(serializer_class(documents, many=True).data), options['repeat'])
+                fast = _time(lambda: ORJSONRenderer().render(reader.many(documents)), options['repeat'])
+                results.append({
+                    'serializer': serializer_class.__name__,
+                    'rows': rows,
+                    'drf_ms': round(drf * 1000, 2),
+                    'fast_ms': round(fast * 1000, 2),
+                    'speedup': round(drf / fast, 1) if fast else None,
+                })
+        self.stdout.write(json.dumps(results, indent=2))
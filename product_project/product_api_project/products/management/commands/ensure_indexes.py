@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from categories.models import Category
+from mongo_common.indexes import plan_problem, verify_query_plans
+from products.models import Product
+
+MODELS = (Category, Product)
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the declared indexes (idempotent) and check with explain() that every declared '
+        'query shape uses one. Exits with an error when any would run as a COLLSCAN, or sort in '
+        'memory when the shape has a sort.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-build', action='store_true', help='Only verify the query plans')
+        parser.add_argument('--skip-verify', action='store_true', help='Only build the indexes')
+
+    def handle(self, *args, **options):
+        if not options['skip_build']:
+            for model in MODELS:
+                model.ensure_indexes()
+                # Superseded indexes are only dropped here, never at web-process startup.
+                if hasattr(model, 'drop_obsolete_indexes'):
+                    for name in model.drop_obsolete_indexes():
+                        self.stdout.write(f'Dropped obsolete index: {model.__name__} ({name})')
+                self.stdout.write(f'Indexes ready: {model.__name__} ({", ".join(index.document["name"] for index in model.INDEXES)})')
+        if options['skip_verify']:
+            return
+        results = verify_query_plans([shape for model in MODELS for shape in model.query_shapes()])
+        for result in results:
+            label = self.style.ERROR(plan_problem(result)) if plan_problem(result) else self.style.SUCCESS('ok')
+            self.stdout.write(f"{label} {result['query']}: {' <- '.join(result['stages'])}")
+        bad = [f"{result['query']} ({plan_problem(result)})" for result in results if plan_problem(result)]
+        if bad:
+            raise CommandError(f"{len(bad)} queries would not be answered from an index in order: {', '.join(bad)}")
@@ -0,0 +1,30 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.bulk import ingest, parse
+
+
+class Command(BaseCommand):
+    help = 'Bulk load products from an NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], help='Defaults to the file extension, else ndjson')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+        path = options['path']
+        data_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        try:
+            if path == '-':
+                summary = ingest(parse(sys.stdin.buffer, data_format), chunk_size=options['chunk_size'])
+            else:
+                with open(path, 'rb') as f:
+                    summary = ingest(parse(f, data_format), chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(summary, indent=2))
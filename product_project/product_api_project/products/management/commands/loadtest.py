@@ -0,0 +1,116 @@
+import json
+import platform
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from categories.models import Category, MongoDBConnection
+from mongo_common import benchmarking
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a benchmark database and report p50/p95/p99 latency, requests per second '
+        'and memory for the product and category endpoints as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Products to seed')
+        parser.add_argument('--categories', type=int, default=50, help='Categories to seed')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--db-name', help='Database to seed (default: <MONGO_DB_NAME>_bench, or MONGO_DB_NAME with --base-url)')
+        parser.add_argument('--mongomock', action='store_true', help='Use an in-memory mongomock client instead of MongoDB')
+        parser.add_argument('--base-url', help='Drive a running server over HTTP instead of the Django test client')
+        parser.add_argument('--no-seed', action='store_true', help='Reuse the data already in --db-name')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark database afterwards')
+        parser.add_argument('--only', help='Comma-separated endpoint names to run')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        if options['mongomock']:
+            if options['base_url']:
+                raise CommandError('--mongomock only applies to in-process runs')
+            benchmarking.use_mongomock()
+        if options['base_url'] and not options['no_seed']:
+            # The server reads its own database, not one seeded from here.
+            raise CommandError('--base-url needs --no-seed: seed the server\'s database first and point --db-name at it')
+        default_db_name = settings.MONGO_DB_NAME if options['base_url'] else f'{settings.MONGO_DB_NAME}_bench'
+        db_name = options['db_name'] or default_db_name
+        if db_name == settings.MONGO_DB_NAME and not options['no_seed']:
+            raise CommandError('Refusing to seed the application database; pick another --db-name or pass --no-seed')
+
+        with override_settings(MONGO_DB_NAME=db_name):
+            if not options['no_seed']:
+                self.seed(options['categories'], options['products'])
+            try:
+                results = self.run(options)
+            finally:
+                if not options['keep'] and not options['no_seed']:
+                    MongoDBConnection.get_client().drop_database(db_name)
+
+        report = {
+            'service': 'product_api',
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'dataset': {'products': options['products'], 'categories': options['categories']},
+            'requests_per_endpoint': options['requests'],
+            'concurrency': options['concurrency'],
+            'transport': 'http' if options['base_url'] else 'test-client',
+            'results': results,
+        }
+        self.stdout.write(benchmarking.write_report(report, options['output'], options['baseline']))
+
+    def seed(self, category_count, product_count):
+        Product.ensure_indexes()
+        categories = [Category.create({'name': f'Category {i}', 'description': 'Benchmark category'}) for i in range(category_count)]
+        rng = random.Random(42)
+        batch = []
+        for i in range(product_count):
+            batch.append(Product({
+                'name': f'Product {i}',
+                'price': round(rng.uniform(1, 1000), 2),
+                'category_id': categories[i % len(categories)].id if categories else '',
+                'description': 'Benchmark product ' * 8,
+            }))
+            if len(batch) == 1000:
+                Product.bulk_insert(batch)
+                batch = []
+        Product.bulk_insert(batch)
+
+    def scenarios(self, options):
+        product = Product.get_page(limit=1)[0][0]
+        category_id = product['category_id']
+        return [
+            ('product-list-page', 'GET', '/api/products/?limit=50'),
+            ('product-list-fields', 'GET', '/api/products/?limit=50&fields=id,name,price'),
+            ('product-list-category', 'GET', f'/api/products/?category_id={category_id}&limit=50'),
+            ('product-list-cheapest', 'GET', f'/api/products/?category_id={category_id}&sort=price&limit=10'),
+            ('product-detail', 'GET', f"/api/product/?id={product['id']}"),
+            # mongomock has no $bucketAuto, so give it fixed buckets.
+            ('product-stats', 'GET', '/api/products/stats/?boundaries=0,100,250,500,1000' if options['mongomock'] else '/api/products/stats/'),
+            ('category-list', 'GET', '/api/categories/'),
+            ('category-detail', 'GET', f'/api/category/?id={category_id}'),
+            ('async-product-detail', 'GET', f"/api/async/product/?id={product['id']}"),
+        ]
+
+    def run(self, options):
+        only = set(options['only'].split(',')) if options['only'] else None
+        results = []
+        for name, method, path in self.scenarios(options):
+            if only and name not in only:
+                continue
+            if options['base_url']:
+                result = benchmarking.run_http(name, method, options['base_url'], path, options['requests'], options['concurrency'])
+            else:
+                result = benchmarking.run_test_client(name, method, path, options['requests'], options['concurrency'])
+            self.stderr.write(json.dumps(result))
+            if benchmarking.server_errors(result):
+                self.stderr.write(self.style.WARNING(f"{name}: {benchmarking.server_errors(result)} responses were server errors"))
+            results.append(result)
+        return results
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from categories.models import Category, backfill_search_fields
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Create the name search indexes and add search fields to products and categories that lack them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        Category.ensure_indexes()
+        Product.ensure_indexes()
+        for collection_name in ('categories', 'products'):
+            updated = backfill_search_fields(collection_name, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Indexed {updated} {collection_name}'))
@@ -0,0 +1,25 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.integrity import scan_orphans
+
+
+class Command(BaseCommand):
+    help = 'Find products whose category no longer exists, and optionally nullify or delete them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Category ids checked per $in query')
+        parser.add_argument('--fix', choices=['nullify', 'cascade'], help='Clear the category_id of orphans, or delete them')
+        parser.add_argument('--interval', type=float, help='Keep running, scanning every N seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            summary = scan_orphans(options['batch_size'], fix=options['fix'])
+            summary['seconds'] = round(time.perf_counter() - started, 3)
+            self.stdout.write(json.dumps(summary))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -1,7 +1,52 @@
 import uuid
-from categories.models import MongoDBConnection, Category
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, ReturnDocument
+from categories.search import matches, name_query, rank, search_fields
+from pymongo.errors import BulkWriteError
+from categories.models import MongoDBConnection, Category, CollectionVersion, denormalize_category_name, now, raise_write_failed, versioned
+from mongo_common.indexes import build_indexes, drop_indexes
+from product_api.serializers import projection
+
+# Orderings for ?sort=. Each ends on the unique id so keyset cursors are
+# unambiguous, and each is the order (or the reverse order) of an index, so
+# sorted reads, with or without category_id / price filters, walk an index
+# instead of sorting in memory.
+SORTS = {
+    'id': [('id', ASCENDING)],
+    '-id': [('id', DESCENDING)],
+    'price': [('price', ASCENDING), ('id', ASCENDING)],
+    '-price': [('price', DESCENDING), ('id', DESCENDING)],
+}
+
+def keyset_filter(sort, after):
+    # Documents strictly after ``after`` (the sort key values of the last row
+    # seen) in ``sort`` order. The leading field gets a plain range so it
+    # bounds the index scan; ties on it are broken by the trailing fields.
+    def comparison(direction):
+        return '$gt' if direction == ASCENDING else '$lt'
+
+    (field, direction), rest = sort[0], sort[1:]
+    if not rest:
+        return {field: {comparison(direction): after[field]}}
+    return {
+        field: {comparison(direction) + 'e': after[field]},
+        '$or': [
+            {field: {comparison(direction): after[field]}},
+            keyset_filter(rest, after),
+        ],
+    }
 
 class Product:
+    INDEXES = [
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+        IndexModel([('category_id', ASCENDING), ('price', ASCENDING), ('id', ASCENDING)], name='category_id_price_id'),
+        IndexModel([('price', ASCENDING), ('id', ASCENDING)], name='price_id'),
+        IndexModel([('name_grams', ASCENDING)], name='name_grams'),
+        IndexModel([('name_lower', ASCENDING)], name='name_lower'),
+    ]
+    # Prefixes of the indexes above, kept by older deployments. Dropped by
+    # manage.py ensure_indexes only.
+    OBSOLETE_INDEXES = ['category_id_price', 'price']
+
     def __init__(self, data=None):
         if data is None:
             data = {}
@@ -10,32 +55,113 @@ class Product:
         self.price = data.get('price', 0.0)
         self.category_id = data.get('category_id', '')
         self.description = data.get('description', '')
+        self.category_name = data.get('category_name')
+        self.version = data.get('version', 1)
+        self.updated_at = data.get('updated_at') or now()
 
     def to_dict(self):
-        return {
+        data = {
             'id': self.id,
             'name': self.name,
             'price': self.price,
             'category_id': self.category_id,
-            'description': self.description
+            'description': self.description,
+            'version': self.version,
+            'updated_at': self.updated_at
         }
+        if self.category_name is not None:
+            data['category_name'] = self.category_name
+        return data
+
+    def to_document(self):
+        return {**self.to_dict(), **search_fields(self.name)}
 
     @staticmethod
     def create(product_data):
         category_id = product_data.get('category_id')
-        if category_id and not Category.get_by_id(category_id):
+        category = Category.get_by_id(category_id) if category_id else None
+        if category_id and not category:
             raise ValueError('Invalid category ID')
         product = Product(product_data)
-        MongoDBConnection.get_collection('products').insert_one(product.to_dict())
+        if denormalize_category_name():
+            product.category_name = category['name'] if category else ''
+        collection = MongoDBConnection.get_collection('products')
+        collection.insert_one(product.to_document())
+        if category_id and not Category.stored_ids([category_id]):
+            # Deleted since it was validated; see Category.delete.
+            collection.delete_one({'id': product.id})
+            raise ValueError('Invalid category ID')
+        CollectionVersion.bump('products')
         return product
 
     @staticmethod
-    def get_all(filters=None):
+    def bulk_insert(products):
+        # Unordered so one bad row does not stop the rest of the batch.
+        # Returns the inserted count and (index, message) pairs for failed rows.
+        operations = [InsertOne(product.to_document()) for product in products]
+        if not operations:
+            return 0, []
+        collection = MongoDBConnection.get_collection('products')
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            inserted, errors = result.inserted_count, []
+        except BulkWriteError as e:
+            details = e.details
+            inserted, errors = details['nInserted'], [(error['index'], error['errmsg']) for error in details['writeErrors']]
+        if inserted:
+            # Categories deleted since the batch was validated (see
+            # Category.delete): one $in lookup, then the orphans are removed.
+            failed = {index for index, _ in errors}
+            referencing = [(index, product) for index, product in enumerate(products) if index not in failed and product.category_id]
+            existing = Category.stored_ids({product.category_id for _, product in referencing}) if referencing else set()
+            orphans = [(index, product) for index, product in referencing if product.category_id not in existing]
+            if orphans:
+                collection.delete_many({'id': {'$in': [product.id for _, product in orphans]}})
+                inserted -= len(orphans)
+                errors += [(index, 'Invalid category ID') for index, _ in orphans]
+        if inserted:
+            CollectionVersion.bump('products')
+        return inserted, errors
+
+    @staticmethod
+    def ensure_indexes():
+        build_indexes(MongoDBConnection.get_collection('products'), Product.INDEXES)
+
+    @staticmethod
+    def drop_obsolete_indexes():
+        return drop_indexes(MongoDBConnection.get_collection('products'), Product.OBSOLETE_INDEXES)
+
+    @staticmethod
+    def query_shapes():
+        # Filtered reads issued by this model, for verify_query_plans.
+        collection = MongoDBConnection.get_collection('products')
+        return [
+            ('Product.get_by_id', collection, {'id': 'example'}, None),
+            ('Product.get_many', collection, {'id': {'$in': ['example', 'other']}}, None),
+            ('Product.get_all category_id', collection, Product.build_query({'category_id': 'example'}), None),
+            ('Product.get_all category_id + price', collection, Product.build_query({'category_id': 'example', 'min_price': 1, 'max_price': 100}), None),
+            ('Product.get_all price', collection, Product.build_query({'min_price': 1, 'max_price': 100}), None),
+            ('Product.get_all name', collection, Product.build_query({'name': 'example'}), None),
+            ('Product.get_all short name', collection, Product.build_query({'name': 'ex'}), None),
+            ('Product.get_page', collection, {'id': {'$gt': 'example'}}, SORTS['id']),
+            ('Product.get_page category_id sort=price', collection, Product.build_query({'category_id': 'example'}), SORTS['price']),
+            ('Product.get_page price sort=-price', collection, Product.build_query({'min_price': 1, 'max_price': 100}), SORTS['-price']),
+            (
+                'Product.get_page category_id sort=price after cursor',
+                collection,
+                {'$and': [Product.build_query({'category_id': 'example'}), keyset_filter(SORTS['price'], {'price': 10.0, 'id': 'example'})]},
+                SORTS['price']
+            ),
+            ('Category.delete reference check', collection, {'category_id': 'example'}, None),
+        ]
+
+    @staticmethod
+    def build_query(filters=None):
         if filters is None:
             filters = {}
         query = {}
         if 'name' in filters:
-            query['name'] = {'$regex': filters['name'], '$options': 'i'}
+            query.update(name_query(filters['name']))
         if 'category_id' in filters:
             query['category_id'] = filters['category_id']
         if 'min_price' in filters:
@@ -43,21 +169,182 @@ class Product:
         if 'max_price' in filters:
             query['price'] = query.get('price', {})
             query['price']['$lte'] = float(filters['max_price'])
-        return list(MongoDBConnection.get_collection('products').find(query))
+        return query
 
     @staticmethod
-    def get_by_id(product_id):
-        return MongoDBConnection.get_collection('products').find_one({'id': product_id})
+    def get_all(filters=None, fields=None, sort=None):
+        # Name searches come back ordered by relevance (see
+        # categories/search.py) unless a sort is given, in which case the
+        # trigram false positives are dropped and index order is kept.
+        name = (filters or {}).get('name')
+        cursor = MongoDBConnection.get_collection('products').find(
+            Product.build_query(filters),
+            projection(fields, required=('name',) if name else ())
+        )
+        if sort:
+            products = list(cursor.sort(SORTS[sort]))
+            return [product for product in products if matches(product.get('name'), name)] if name else products
+        products = list(cursor)
+        return rank(products, name) if name else products
 
     @staticmethod
-    def update(product_id, data):
-        if 'category_id' in data and data['category_id'] and not Category.get_by_id(data['category_id']):
-            raise ValueError('Invalid category ID')
-        return MongoDBConnection.get_collection('products').update_one(
+    def iter_all(filters=None, batch_size=1000, fields=None, sort=None):
+        name = (filters or {}).get('name')
+        cursor = MongoDBConnection.get_collection('products').find(
+            Product.build_query(filters),
+            projection(fields, required=('name',) if name else ())
+        ).batch_size(batch_size)
+        if sort:
+            cursor = cursor.sort(SORTS[sort])
+        if name:
+            return (product for product in cursor if matches(product.get('name'), name))
+        return cursor
+
+    @staticmethod
+    def get_page(filters=None, after=None, limit=50, fields=None, sort='id'):
+        # Keyset pagination in ``sort`` order: ``after`` holds the sort key
+        # values of the previous page's last row. One extra row tells whether
+        # another page exists without running a count. Returns the page and
+        # the position to continue from (None on the last page).
+        # Name searches drop trigram false positives, fetching further
+        # batches until limit + 1 rows pass or the matches run out.
+        sort = SORTS[sort or 'id']
+        name = (filters or {}).get('name')
+        base = Product.build_query(filters)
+        required = tuple(field for field, _ in sort) + (('name',) if name else ())
+        products = []
+        while True:
+            query = base
+            if after:
+                query = {'$and': [base, keyset_filter(sort, after)]} if base else keyset_filter(sort, after)
+            batch = list(MongoDBConnection.get_collection('products').find(
+                query,
+                projection(fields, required=required)
+            ).sort(sort).limit(limit + 1))
+            products.extend(product for product in batch if not name or matches(product.get('name'), name))
+            if len(products) > limit or len(batch) <= limit:
+                break
+            after = {field: batch[-1][field] for field, _ in sort}
+        if len(products) > limit:
+            products = products[:limit]
+            return products, {field: products[-1][field] for field, _ in sort}
+        return products, None
+
+    @staticmethod
+    def get_stats(filters=None, boundaries=None, buckets=10):
+        # One round trip: the $match runs against the (category_id, price)
+        # index, then $facet computes every view over the matched prices.
+        if boundaries:
+            histogram = [{'$bucket': {
+                'groupBy': '$price',
+                'boundaries': boundaries,
+                'default': 'other',
+                'output': {'count': {'$sum': 1}},
+            }}]
+        else:
+            histogram = [{'$bucketAuto': {
+                'groupBy': '$price',
+                'buckets': buckets,
+                'output': {'count': {'$sum': 1}},
+            }}]
+        pipeline = [
+            {'$match': Product.build_query(filters)},
+            {'$project': {'_id': 0, 'category_id': 1, 'price': 1}},
+            {'$facet': {
+                'totals': [{'$group': {
+                    '_id': None,
+                    'count': {'$sum': 1},
+                    'min_price': {'$min': '$price'},
+                    'avg_price': {'$avg': '$price'},
+                    'max_price': {'$max': '$price'},
+                }}],
+                'by_category': [
+                    {'$group': {
+                        '_id': '$category_id',
+                        'count': {'$sum': 1},
+                        'min_price': {'$min': '$price'},
+                        'avg_price': {'$avg': '$price'},
+                        'max_price': {'$max': '$price'},
+                    }},
+                    {'$sort': {'_id': 1}},
+                ],
+                'price_histogram': histogram,
+            }},
+        ]
+        result = next(MongoDBConnection.get_collection('products').aggregate(pipeline), {})
+        totals = result.get('totals') or [{'count': 0, 'min_price': None, 'avg_price': None, 'max_price': None}]
+        totals[0].pop('_id', None)
+        by_category = []
+        for group in result.get('by_category', []):
+            group['category_id'] = group.pop('_id')
+            by_category.append(group)
+        histogram = []
+        for bucket in result.get('price_histogram', []):
+            bucket_id = bucket.pop('_id')
+            if isinstance(bucket_id, dict):
+                bucket['min'], bucket['max'] = bucket_id['min'], bucket_id['max']
+            elif bucket_id == 'other':
+                bucket['min'] = bucket['max'] = None
+            else:
+                bucket['min'], bucket['max'] = bucket_id, boundaries[boundaries.index(bucket_id) + 1]
+            histogram.append(bucket)
+        return {'totals': totals[0], 'by_category': by_category, 'price_histogram': histogram}
+
+    @staticmethod
+    def get_by_id(product_id, fields=None, required=()):
+        return MongoDBConnection.get_collection('products').find_one({'id': product_id}, projection(fields, required=required))
+
+    @staticmethod
+    def get_version(product_id):
+        # Just the validators, for answering conditional GETs.
+        return MongoDBConnection.get_collection('products').find_one(
             {'id': product_id},
-            {'$set': data}
+            {'_id': 0, 'version': 1, 'updated_at': 1}
         )
 
     @staticmethod
-    def delete(product_id):
-        return MongoDBConnection.get_collection('products').delete_one({'id': product_id})
\ No newline at end of file
+    def get_many(product_ids, fields=None, required=()):
+        # Returns {id: product} for the ids that exist, with a single $in query.
+        cursor = MongoDBConnection.get_collection('products').find(
+            {'id': {'$in': list(product_ids)}},
+            projection(fields, required=('id', *required))
+        )
+        return {product['id']: product for product in cursor}
+
+    @staticmethod
+    def update(product_id, data, expected_version=None):
+        # The conditional write is one atomic find_one_and_update returning
+        # the new document (DocumentNotFound or VersionConflict when nothing
+        # matched); the collection version is bumped separately after it
+        # (see CollectionVersion).
+        if 'category_id' in data:
+            category = Category.get_by_id(data['category_id']) if data['category_id'] else None
+            if data['category_id'] and not category:
+                raise ValueError('Invalid category ID')
+            if denormalize_category_name():
+                data = {**data, 'category_name': category['name'] if category else ''}
+        if 'name' in data:
+            data = {**data, **search_fields(data['name'])}
+        collection = MongoDBConnection.get_collection('products')
+        product = collection.find_one_and_update(
+            versioned({'id': product_id}, expected_version),
+            {'$set': {**data, 'updated_at': now()}, '$inc': {'version': 1}},
+            projection=projection(),
+            return_document=ReturnDocument.AFTER
+        )
+        if product is None:
+            raise_write_failed(collection, product_id, expected_version)
+        CollectionVersion.bump('products')
+        return product
+
+    @staticmethod
+    def delete(product_id, expected_version=None):
+        collection = MongoDBConnection.get_collection('products')
+        product = collection.find_one_and_delete(
+            versioned({'id': product_id}, expected_version),
+            projection={'_id': 0, 'id': 1, 'version': 1}
+        )
+        if product is None:
+            raise_write_failed(collection, product_id, expected_version)
+        CollectionVersion.bump('products')
+        return product
\ No newline at end of file
@@ -0,0 +1,97 @@
+import base64
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from product_api.renderers import dumps
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def encode_cursor(position, sort='id'):
+    # ``position`` holds the sort key values of the last row returned; the
+    # sort is recorded so the cursor cannot be replayed under another order.
+    if position is None:
+        return None
+    payload = json.dumps({**position, 's': sort}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+
+def decode_cursor(cursor, sort='id', sorts=None):
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        cursor_sort = payload.pop('s', 'id')
+        fields = [field for field, _ in sorts[sort]] if sorts else ['id']
+        position = {field: payload[field] for field in fields}
+        position['id'] = str(position['id'])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort:
+        raise ValueError('cursor was issued for a different sort')
+    return position
+
+
+def parse_sort(value, sorts):
+    if not value:
+        return None
+    if value not in sorts:
+        raise ValueError(f"sort must be one of: {', '.join(sorts)}")
+    return value
+
+
+def parse_limit(value):
+    default = getattr(settings, 'PAGE_SIZE', 50)
+    maximum = getattr(settings, 'MAX_PAGE_SIZE', 1000)
+    if value in (None, ''):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def _ndjson_rows(documents, represent):
+    for document in documents:
+        yield dumps(represent(document)) + '\n'
+
+
+def _json_array_rows(documents, represent):
+    yield '['
+    separator = ''
+    for document in documents:
+        yield separator + dumps(represent(document))
+        separator = ','
+    yield ']'
+
+
+async def _async_ndjson_rows(documents, represent):
+    async for document in documents:
+        yield dumps(represent(document)) + '\n'
+
+
+async def _async_json_array_rows(documents, represent):
+    yield '['
+    separator = ''
+    async for document in documents:
+        yield separator + dumps(represent(document))
+        separator = ','
+    yield ']'
+
+
+def streaming_response(documents, represent, stream_format):
+    # ``represent`` maps one raw document to its output dict. ``documents``
+    # may be an async iterable (the async views), which makes the response
+    # body async too.
+    if hasattr(documents, '__aiter__'):
+        rows = (_async_ndjson_rows if stream_format == 'ndjson' else _async_json_array_rows)(documents, represent)
+    elif stream_format == 'ndjson':
+        rows = _ndjson_rows(documents, represent)
+    else:
+        rows = _json_array_rows(documents, represent)
+    return StreamingHttpResponse(rows, content_type=STREAM_FORMATS[stream_format])
@@ -1,15 +1,27 @@
 from rest_framework import serializers
 from categories.models import Category
+from product_api.serializers import DynamicFieldsMixin
 from .models import Product
 
-class ProductSerializer(serializers.Serializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.Serializer):
+    # Product objects always carry category_name; leave it out when None,
+    # like the documents that lack it.
+    OMIT_IF_NONE = ('category_name',)
+
     id = serializers.CharField(read_only=True)
     name = serializers.CharField(max_length=255, required=False, allow_blank=True)
     price = serializers.FloatField(required=False, default=0.0)
     category_id = serializers.CharField(max_length=36, required=False, allow_blank=True)
     description = serializers.CharField(allow_blank=True, required=False)
+    # Only present when PRODUCT_DENORMALIZE_CATEGORY_NAME is on.
+    category_name = serializers.CharField(read_only=True)
+    version = serializers.IntegerField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
 
     def validate_category_id(self, value):
+        # Bulk ingestion checks category ids per batch instead of per row.
+        if not self.context.get('validate_category', True):
+            return value
         if value and not Category.get_by_id(value):
             raise serializers.ValidationError('Invalid category ID')
         return value
@@ -18,5 +30,4 @@ class ProductSerializer(serializers.Serializer):
         return Product.create(validated_data)
 
     def update(self, instance, validated_data):
-        Product.update(instance['id'], validated_data)
-        return Product.get_by_id(instance['id'])
\ No newline at end of file
+        return Product.update(instance['id'], validated_data, expected_version=self.context.get('expected_version'))
\ No newline at end of file
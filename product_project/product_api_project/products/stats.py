@@ -0,0 +1,32 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from categories.models import CollectionVersion
+from .models import Product
+
+
+def parse_boundaries(value):
+    if not value:
+        return None
+    boundaries = [float(part) for part in value.split(',') if part.strip()]
+    if len(boundaries) < 2 or boundaries != sorted(set(boundaries)):
+        raise ValueError('boundaries must be at least two increasing numbers')
+    return boundaries
+
+
+def get_product_stats(filters=None, boundaries=None, buckets=10):
+    # Results are keyed on the products collection version, so any product
+    # write makes the next request recompute instead of waiting for a TTL.
+    params = json.dumps({'filters': filters or {}, 'boundaries': boundaries, 'buckets': buckets}, sort_keys=True)
+    version = CollectionVersion.get('products')
+    key = f"product-stats:{version}:{hashlib.sha1(params.encode('utf-8')).hexdigest()}"
+    cache = caches[getattr(settings, 'PRODUCT_STATS_CACHE_ALIAS', 'default')]
+    stats = cache.get(key)
+    if stats is None:
+        stats = Product.get_stats(filters, boundaries=boundaries, buckets=buckets)
+        stats['version'] = version
+        cache.set(key, stats, getattr(settings, 'PRODUCT_STATS_CACHE_TTL', 600))
+    return stats
@@ -1,3 +1,170 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from categories import cache, catalog
+from categories.models import Category, DocumentNotFound, VersionConflict
+from mongo_common.benchmarking import use_mongomock
+from product_api.renderers import ORJSONRenderer
+from .models import SORTS, Product
+from .pagination import decode_cursor, encode_cursor
+from .serializers import ProductSerializer
+
+
+class ProductWriteTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        self.category = Category.create({'name': 'Books'})
+        self.product = Product.create({'name': 'Dune', 'price': 10.0, 'category_id': self.category.id})
+
+    def test_update_returns_the_new_version(self):
+        product = Product.update(self.product.id, {'price': 12.0})
+        self.assertEqual((product['price'], product['version']), (12.0, 2))
+
+    def test_stale_version_conflicts(self):
+        Product.update(self.product.id, {'price': 12.0})
+        with self.assertRaises(VersionConflict) as raised:
+            Product.update(self.product.id, {'price': 14.0}, expected_version=1)
+        self.assertEqual(raised.exception.current_version, 2)
+        with self.assertRaises(VersionConflict):
+            Product.delete(self.product.id, expected_version=1)
+        self.assertEqual(Product.get_by_id(self.product.id)['price'], 12.0)
+
+    def test_missing_document_is_not_a_conflict(self):
+        with self.assertRaises(DocumentNotFound):
+            Product.update('missing', {'price': 1.0}, expected_version=1)
+        Product.delete(self.product.id, expected_version=1)
+        with self.assertRaises(DocumentNotFound):
+            Product.delete(self.product.id, expected_version=1)
+
+    def test_if_match_takes_the_detail_etag(self):
+        # mongomock re-reads a ReturnDocument.AFTER result with the original
+        # filter, so a successful conditional PUT cannot be checked here.
+        url = f'/api/product/?id={self.product.id}'
+        etag = self.client.get(url).headers['ETag']
+        self.client.put(f'{url}&price=12')
+        self.assertEqual(self.client.put(f'{url}&price=14', HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=self.client.get(url).headers['ETag']).status_code, 204)
+        self.assertEqual(self.client.put(f'{url}&price=14').status_code, 404)
+
+
+class ProductSortTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        category = Category.create({'name': 'Books'})
+        for i, price in enumerate([5, 3, 3, 9, 1, 3, 7, 2]):
+            Product.create({'name': f'P{i}', 'price': float(price), 'category_id': category.id})
+
+    def pages(self, sort, filters=None):
+        # Each position goes through a cursor, as it would between requests.
+        rows, after = [], None
+        while True:
+            page, position = Product.get_page(filters, after=after, limit=3, sort=sort)
+            rows += page
+            if position is None:
+                return rows
+            after = decode_cursor(encode_cursor(position, sort), sort, SORTS)
+
+    def test_pages_match_the_unpaged_order(self):
+        for sort in SORTS:
+            with self.subTest(sort=sort):
+                ids = [product['id'] for product in Product.get_all(sort=sort)]
+                self.assertEqual([product['id'] for product in self.pages(sort)], ids)
+                self.assertEqual(len(ids), 8)
+
+    def test_price_ties_break_on_id(self):
+        rows = self.pages('price', {'max_price': '3'})
+        self.assertEqual(rows, sorted(rows, key=lambda product: (product['price'], product['id'])))
+        self.assertEqual([product['price'] for product in rows], [1, 2, 3, 3, 3])
+
+    def test_cursor_is_bound_to_its_sort(self):
+        cursor = self.client.get('/api/products/?limit=2&sort=price').json()['next_cursor']
+        self.assertEqual(self.client.get(f'/api/products/?limit=2&sort=-price&cursor={cursor}').status_code, 400)
+
+
+class ProductBulkTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        self.category = Category.create({'name': 'Books'})
+
+    def test_chunk_size_must_be_a_positive_integer(self):
+        body = f'{{"name": "Dune", "price": 10, "category_id": "{self.category.id}"}}\n'
+        for chunk_size in ('0', '-1', 'ten'):
+            with self.subTest(chunk_size=chunk_size):
+                response = self.client.post(f'/api/products/bulk/?chunk_size={chunk_size}', body, content_type='application/x-ndjson')
+                self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/products/bulk/?chunk_size=1', body, content_type='application/x-ndjson')
+        self.assertEqual(response.json()['inserted'], 1)
+
+
+class ProductNameFilterTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        category = Category.create({'name': 'Books'})
+        # "Dun Une" has every trigram of "dune" without containing it.
+        for name, price in [('Dun Une', 1.0), ('Dune', 2.0), ('Dun Une II', 3.0), ('Dune Messiah', 4.0)]:
+            Product.create({'name': name, 'price': price, 'category_id': category.id})
+
+    def test_trigram_false_positives_are_dropped_on_every_path(self):
+        filters = {'name': 'dune'}
+        expected = ['Dune', 'Dune Messiah']
+        self.assertEqual([product['name'] for product in Product.get_all(filters, sort='price')], expected)
+        self.assertEqual([product['name'] for product in Product.iter_all(filters, sort='price')], expected)
+        page, position = Product.get_page(filters, limit=1, sort='price')
+        self.assertEqual([product['name'] for product in page], ['Dune'])
+        page, position = Product.get_page(filters, after=position, limit=1, sort='price')
+        self.assertEqual(([product['name'] for product in page], position), (['Dune Messiah'], None))
+
+
+class ProductSerializerTests(SimpleTestCase):
+    documents = [
+        {'id': 'p1', 'name': 'Dune', 'price': 10, 'category_id': 'c1', 'category_name': 'Books', 'version': 2},
+        {'id': 'p2', 'name': 'Emma', 'category_id': '', 'category_name': None},
+        {'id': 'p3', 'name': 'Ulysses', 'price': 12.5, 'description': None},
+    ]
+
+    def test_fast_reader_matches_drf(self):
+        for fields in (None, ['name', 'category_name'], ['price', 'id']):
+            with self.subTest(fields=fields):
+                self.assertEqual(
+                    ProductSerializer.reader(fields).many(self.documents),
+                    ProductSerializer(self.documents, many=True, fields=fields).data,
+                )
+
+    def test_readers_are_shared_by_equivalent_field_lists(self):
+        self.assertIs(ProductSerializer.reader(['name', 'id']), ProductSerializer.reader(['id', 'name', 'id']))
+        with self.assertRaises(ValueError):
+            ProductSerializer.reader(['id', 'secret'])
+
+    def test_indented_output_goes_through_drf(self):
+        rendered = ORJSONRenderer().render({'id': 'p1'}, 'application/json; indent=4')
+        self.assertEqual(rendered, b'{\n    "id": "p1"\n}')
+
+
+class ProductStreamTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._category_cache = None
+        catalog._catalog = None
+        category = Category.create({'name': 'Books'})
+        for i, price in enumerate([5, 3, 9, 1]):
+            Product.create({'name': f'P{i}', 'price': float(price), 'category_id': category.id})
+
+    async def test_async_view_streams_like_the_sync_view(self):
+        for stream in ('ndjson', 'json'):
+            with self.subTest(stream=stream):
+                query = f'?stream={stream}&sort=price&fields=id,price'
+                expected = b''.join((await sync_to_async(self.client.get)(f'/api/products/{query}')).streaming_content)
+                self.assertEqual(expected.count(b'"id"'), 4)
+                response = await self.async_client.get(f'/api/async/products/{query}')
+                self.assertTrue(response.is_async)
+                self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), expected)
+        response = await self.async_client.get('/api/async/products/?stream=xml')
+        self.assertEqual(response.status_code, 400)
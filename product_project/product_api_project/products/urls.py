@@ -1,7 +1,13 @@
 from django.urls import path
-from .views import ProductListView, ProductDetailView
+from .views import ProductListView, ProductStatsView, ProductBatchView, ProductBulkView, ProductDetailView
+from .async_views import AsyncProductListView, AsyncProductDetailView
 
 urlpatterns = [
     path('products/', ProductListView.as_view(), name='product-list'),
+    path('products/stats/', ProductStatsView.as_view(), name='product-stats'),
+    path('products/batch/', ProductBatchView.as_view(), name='product-batch'),
+    path('products/bulk/', ProductBulkView.as_view(), name='product-bulk'),
     path('product/', ProductDetailView.as_view(), name='product-detail'),
+    path('async/products/', AsyncProductListView.as_view(), name='async-product-list'),
+    path('async/product/', AsyncProductDetailView.as_view(), name='async-product-detail'),
 ]
\ No newline at end of file
@@ -1,11 +1,20 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Product
+from .models import SORTS, Product
 from .serializers import ProductSerializer
+from categories.models import Category, CollectionVersion, DocumentNotFound, VersionConflict
+from categories.serializers import CategorySerializer
+from product_api.conditional import (
+    VALIDATOR_FIELDS, collection_etag, document_etag, expected_version, is_conditional, not_modified, set_validators
+)
+from product_api.serializers import parse_fields, parse_ids, serialize
+from functools import partial
+from .bulk import BULK_FORMATS, ingest, parse
+from .stats import get_product_stats, parse_boundaries
+from .pagination import STREAM_FORMATS, decode_cursor, encode_cursor, parse_limit, parse_sort, streaming_response
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class ProductListView(APIView):
@@ -18,12 +27,39 @@ class ProductListView(APIView):
                 'max_price': request.query_params.get('max_price', '')
             }
             filters = {k: v for k, v in filters.items() if v}
-            logger.debug(f"GET filters: {filters}")
-            products = Product.get_all(filters)
-            serializer = ProductSerializer(products, many=True)
-            return Response(serializer.data)
+            logger.debug("GET filters: %s", filters)
+            try:
+                fields = parse_fields(request.query_params.get('fields'), ProductSerializer)
+                sort = parse_sort(request.query_params.get('sort'), SORTS)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            # Read before the query: a write in between leaves an older tag,
+            # which only costs the client a full response next time.
+            etag = collection_etag(request, CollectionVersion.get('products'))
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+            stream_format = request.query_params.get('stream')
+            if stream_format:
+                if stream_format not in STREAM_FORMATS:
+                    return Response({'error': f"stream must be one of: {', '.join(STREAM_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+                represent = partial(serialize, ProductSerializer, fields=fields)
+                return set_validators(streaming_response(Product.iter_all(filters, fields=fields, sort=sort), represent, stream_format), etag)
+            if 'limit' in request.query_params or 'cursor' in request.query_params:
+                try:
+                    limit = parse_limit(request.query_params.get('limit'))
+                    after = decode_cursor(request.query_params.get('cursor'), sort or 'id', SORTS)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                products, position = Product.get_page(filters, after=after, limit=limit, fields=fields, sort=sort)
+                return set_validators(Response({
+                    'results': serialize(ProductSerializer, products, many=True, fields=fields),
+                    'next_cursor': encode_cursor(position, sort or 'id'),
+                }), etag)
+            products = Product.get_all(filters, fields=fields, sort=sort)
+            return set_validators(Response(serialize(ProductSerializer, products, many=True, fields=fields)), etag)
         except Exception as e:
-            logger.error(f"Error in ProductListView.get: {str(e)}")
+            logger.error("Error in ProductListView.get: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def post(self, request):
@@ -34,15 +70,92 @@ class ProductListView(APIView):
                 'category_id': request.query_params.get('category_id', ''),
                 'description': request.query_params.get('description', '')
             }
-            logger.debug(f"POST data: {data}")
+            logger.debug("POST data: %s", data)
             serializer = ProductSerializer(data=data)
             if serializer.is_valid():
                 product = serializer.save()
                 return Response(ProductSerializer(product).data, status=status.HTTP_201_CREATED)
-            logger.error(f"Serializer errors: {serializer.errors}")
+            logger.error("Serializer errors: %s", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error in ProductListView.post: {str(e)}")
+            logger.error("Error in ProductListView.post: %s", e)
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ProductStatsView(APIView):
+    def get(self, request):
+        try:
+            filters = {
+                'category_id': request.query_params.get('category_id', ''),
+                'min_price': request.query_params.get('min_price', ''),
+                'max_price': request.query_params.get('max_price', '')
+            }
+            filters = {k: v for k, v in filters.items() if v}
+            logger.debug("GET stats filters: %s", filters)
+            try:
+                boundaries = parse_boundaries(request.query_params.get('boundaries'))
+                buckets = int(request.query_params.get('buckets', 10))
+                if buckets < 1:
+                    raise ValueError('buckets must be a positive integer')
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(get_product_stats(filters, boundaries=boundaries, buckets=buckets))
+        except Exception as e:
+            logger.error("Error in ProductStatsView.get: %s", e)
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ProductBatchView(APIView):
+    def get(self, request):
+        return self.resolve(request, request.query_params.get('ids'))
+
+    def post(self, request):
+        # Same as GET, for id lists too long for a query string: {"ids": [...]}
+        return self.resolve(request, request.data.get('ids') if isinstance(request.data, dict) else None)
+
+    def resolve(self, request, ids):
+        try:
+            try:
+                ids = parse_ids(ids)
+                fields = parse_fields(request.query_params.get('fields'), ProductSerializer)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            embed_category = request.query_params.get('embed') == 'category'
+            logger.debug("Batch product ids: %s", ids)
+            found = Product.get_many(ids, fields=fields, required=('category_id',) if embed_category else ())
+            products = [found[product_id] for product_id in ids if product_id in found]
+            results = serialize(ProductSerializer, products, many=True, fields=fields)
+            if embed_category:
+                categories = Category.get_many(product['category_id'] for product in products if product.get('category_id'))
+                for product, data in zip(products, results):
+                    category = categories.get(product.get('category_id'))
+                    data['category'] = serialize(CategorySerializer, category) if category else None
+            return Response({
+                'results': results,
+                'missing': [product_id for product_id in ids if product_id not in found],
+            })
+        except Exception as e:
+            logger.error("Error in ProductBatchView: %s", e)
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ProductBulkView(APIView):
+    def post(self, request):
+        try:
+            content_type = request.content_type.split(';')[0].strip() or 'application/x-ndjson'
+            if content_type not in BULK_FORMATS:
+                return Response({'error': f"Content-Type must be one of: {', '.join(BULK_FORMATS)}"}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+            stream = request.stream
+            if stream is None:
+                return Response({'error': 'Request body is empty'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                chunk_size = int(request.query_params['chunk_size']) if request.query_params.get('chunk_size') else None
+                if chunk_size is not None and chunk_size < 1:
+                    raise ValueError
+            except ValueError:
+                return Response({'error': 'chunk_size must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+            summary = ingest(parse(stream, BULK_FORMATS[content_type]), chunk_size=chunk_size)
+            logger.debug("Bulk ingest summary: received=%s inserted=%s", summary['received'], summary['inserted'])
+            return Response(summary)
+        except Exception as e:
+            logger.error("Error in ProductBulkView.post: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class ProductDetailView(APIView):
@@ -51,14 +164,26 @@ class ProductDetailView(APIView):
             product_id = request.query_params.get('id')
             if not product_id:
                 return Response({'error': 'Product ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            logger.debug(f"GET product_id: {product_id}")
-            product = Product.get_by_id(product_id)
+            logger.debug("GET product_id: %s", product_id)
+            try:
+                fields = parse_fields(request.query_params.get('fields'), ProductSerializer)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if is_conditional(request):
+                # Answer revalidations from the version fields alone.
+                current = Product.get_version(product_id)
+                if not current:
+                    return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+                response = not_modified(request, document_etag(request, current), current.get('updated_at'))
+                if response is not None:
+                    return response
+            product = Product.get_by_id(product_id, fields=fields, required=VALIDATOR_FIELDS)
             if not product:
                 return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
-            serializer = ProductSerializer(product)
-            return Response(serializer.data)
+            response = Response(serialize(ProductSerializer, product, fields=fields))
+            return set_validators(response, document_etag(request, product), product.get('updated_at'))
         except Exception as e:
-            logger.error(f"Error in ProductDetailView.get: {str(e)}")
+            logger.error("Error in ProductDetailView.get: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def put(self, request):
@@ -66,24 +191,27 @@ class ProductDetailView(APIView):
             product_id = request.query_params.get('id')
             if not product_id:
                 return Response({'error': 'Product ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            product = Product.get_by_id(product_id)
-            if not product:
-                return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
-            data = {
-                'name': request.query_params.get('name', product['name']),
-                'price': float(request.query_params.get('price', product['price'])) if request.query_params.get('price') else product['price'],
-                'category_id': request.query_params.get('category_id', product['category_id']),
-                'description': request.query_params.get('description', product['description'])
-            }
-            logger.debug(f"PUT data: {data}")
-            serializer = ProductSerializer(product, data=data, partial=True)
-            if serializer.is_valid():
+            try:
+                version = expected_version(request)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            data = {name: request.query_params.get(name) for name in ('name', 'category_id', 'description') if name in request.query_params}
+            if request.query_params.get('price'):
+                data['price'] = request.query_params.get('price')
+            logger.debug("PUT data: %s", data)
+            serializer = ProductSerializer({'id': product_id}, data=data, partial=True, context={'expected_version': version})
+            if not serializer.is_valid():
+                logger.error("Serializer errors: %s", serializer.errors)
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            try:
                 updated_product = serializer.save()
-                return Response(ProductSerializer(updated_product).data)
-            logger.error(f"Serializer errors: {serializer.errors}")
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            except DocumentNotFound:
+                return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+            except VersionConflict as e:
+                return Response({'error': str(e), 'version': e.current_version}, status=status.HTTP_412_PRECONDITION_FAILED)
+            return Response(ProductSerializer(updated_product).data)
         except Exception as e:
-            logger.error(f"Error in ProductDetailView.put: {str(e)}")
+            logger.error("Error in ProductDetailView.put: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def delete(self, request):
@@ -91,12 +219,16 @@ class ProductDetailView(APIView):
             product_id = request.query_params.get('id')
             if not product_id:
                 return Response({'error': 'Product ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            logger.debug(f"DELETE product_id: {product_id}")
-            product = Product.get_by_id(product_id)
-            if not product:
+            logger.debug("DELETE product_id: %s", product_id)
+            try:
+                Product.delete(product_id, expected_version=expected_version(request))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except DocumentNotFound:
                 return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
-            Product.delete(product_id)
+            except VersionConflict as e:
+                return Response({'error': str(e), 'version': e.current_version}, status=status.HTTP_412_PRECONDITION_FAILED)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
-            logger.error(f"Error in ProductDetailView.delete: {str(e)}")
+            logger.error("Error in ProductDetailView.delete: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""
+MongoDB infrastructure shared by the product and student APIs.
+
+Installed into each project's environment from its requirements file
+(``pip install -e <repo>/shared``) and imported as ``mongo_common.<module>``:
+the per-process client (``mongo_config``), request and command metrics
+(``metrics``), the pool-stats and ``/metrics`` views (``views``), response
+compression (``compression``), the read-through cache backends (``cache``),
+bulk import parsing (``bulk``), index builds and plan checks (``indexes``),
+change-stream consumers (``changestreams``) and the load-test helpers
+(``benchmarking``).
+"""
@@ -0,0 +1,154 @@
+"""
+Shared pieces of the ``loadtest`` management commands.
+
+Endpoints are driven either in-process through the Django test client (which
+also gives per-endpoint Python memory via tracemalloc) or over HTTP against a
+running server. Results are plain dicts so runs can be saved as JSON and
+compared with ``compare``.
+"""
+
+import json
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+
+from . import mongo_config
+
+
+def use_mongomock():
+    try:
+        import mongomock
+    except ImportError:
+        raise RuntimeError('mongomock is not installed; pip install mongomock or benchmark against a real MongoDB')
+    mongo_config.set_client(mongomock.MongoClient())
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name, latencies, elapsed, statuses, peak_memory=None):
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        'endpoint': name,
+        'requests': len(latencies),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'peak_memory_kb': None if peak_memory is None else round(peak_memory / 1024, 1),
+    }
+
+
+def server_errors(result):
+    return sum(count for code, count in result['statuses'].items() if code.startswith('5'))
+
+
+def _drive(total, concurrency, send):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(_):
+        started = time.perf_counter()
+        status = send()
+        latency = time.perf_counter() - started
+        with lock:
+            latencies.append(latency)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(total):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(total)))
+    return latencies, time.perf_counter() - started, statuses
+
+
+def run_test_client(name, method, path, total, concurrency=1, data=None, content_type=None):
+    local = threading.local()
+
+    def send():
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        kwargs = {}
+        if data is not None:
+            kwargs = {'data': data, 'content_type': content_type or 'application/json'}
+        response = getattr(client, method.lower())(path, **kwargs)
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        send()  # warm up imports and caches outside the measurement
+        tracemalloc.start()
+        try:
+            latencies, elapsed, statuses = _drive(total, concurrency, send)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return summarize(name, latencies, elapsed, statuses, peak)
+
+
+def run_http(name, method, base_url, path, total, concurrency=1, data=None, content_type=None):
+    url = base_url.rstrip('/') + path
+    body = data.encode('utf-8') if isinstance(data, str) else data
+
+    def send():
+        request = urllib.request.Request(url, data=body, method=method.upper())
+        if body is not None:
+            request.add_header('Content-Type', content_type or 'application/json')
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    latencies, elapsed, statuses = _drive(total, concurrency, send)
+    return summarize(name, latencies, elapsed, statuses)
+
+
+def compare(baseline, current):
+    # Percentage change per endpoint for the latency and throughput numbers.
+    previous = {result['endpoint']: result for result in baseline.get('results', [])}
+    changes = []
+    for result in current['results']:
+        before = previous.get(result['endpoint'])
+        if not before:
+            continue
+        change = {'endpoint': result['endpoint']}
+        for key in ('requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_memory_kb'):
+            if before.get(key) and result.get(key) is not None:
+                change[f'{key}_change_pct'] = round((result[key] - before[key]) / before[key] * 100, 1)
+        changes.append(change)
+    return changes
+
+
+def write_report(report, output=None, baseline=None):
+    if baseline:
+        with open(baseline) as f:
+            report['comparison'] = compare(json.load(f), report)
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    return text
@@ -0,0 +1,58 @@
+"""
+Row parsing for the bulk import endpoints of both APIs.
+
+``parse`` turns an iterable of lines (``str`` or ``bytes``, e.g. a request
+body read line by line) into ``(row_number, data, parse_error)`` tuples
+without reading the whole body; ``chunks`` batches them for ``insert_many``.
+Validation stays with each app, which knows its own documents.
+"""
+
+import csv
+import json
+from itertools import islice
+
+BULK_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+
+def parse_ndjson(lines):
+    row_number = 0
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f'Invalid JSON: {e.msg}'
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, 'Each line must be a JSON object'
+            continue
+        yield row_number, data, None
+
+
+def parse_csv(lines):
+    decoded = (line.decode('utf-8') if isinstance(line, bytes) else line for line in lines)
+    for row_number, row in enumerate(csv.DictReader(decoded), start=1):
+        yield row_number, {k: v for k, v in row.items() if k is not None and v != ''}, None
+
+
+def parse(lines, data_format):
+    if data_format == 'csv':
+        return parse_csv(lines)
+    return parse_ndjson(lines)
+
+
+def chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
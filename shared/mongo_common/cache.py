@@ -0,0 +1,244 @@
+"""
+Cache backends behind the read-through caches of both APIs.
+
+``build_cache`` turns a settings dict (``CATEGORY_CACHE``, ``STUDENT_CACHE``)
+into one of: a per-process LRU with a TTL (``'local'``), an adapter over a
+Django cache alias shared by every worker (``'django'``) or a no-op
+(``None``). ``get`` returns ``MISSING`` when nothing is cached, so ``None``
+can be cached as a value (a remembered miss).
+
+Read-through fills use ``add``, which never replaces an entry, and
+``delete`` leaves a tombstone for ``TOMBSTONE_TTL`` seconds (``clear`` blocks
+every fill for as long). A reader that fetched a document before a write
+therefore cannot cache it after the writer's delete, as long as its read
+took less than ``TOMBSTONE_TTL``; for that long after a write, the key is
+read from Mongo.
+
+With the local backend, ``INVALIDATION_ALIAS`` names a shared Django cache
+used to tell other workers about writes: every invalidation bumps a
+generation counter there, and each worker compares it with the one it last
+saw at most every ``INVALIDATION_INTERVAL`` seconds, dropping its local
+entries when it moved. Other workers then lag writes by at most that
+interval, without a shared-cache round trip on every read.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+MISSING = object()
+TOMBSTONE = 'tombstone'
+
+
+class LRUCache:
+    """Thread-safe, size-bounded in-process cache with a per-entry TTL."""
+
+    def __init__(self, max_size=1024, ttl=300, tombstone_ttl=5):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self._entries = OrderedDict()
+        self._cleared_until = 0.0
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key, MISSING)
+        if entry is MISSING:
+            return MISSING
+        value, expires_at = entry
+        if expires_at < now:
+            del self._entries[key]
+            return MISSING
+        return value
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+            if value is MISSING or value is TOMBSTONE:
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, time.monotonic() + (self.ttl if ttl is None else ttl))
+
+    def add(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._cleared_until or self._lookup(key, now) is not MISSING:
+                return False
+            self._store(key, value, now + (self.ttl if ttl is None else ttl))
+            return True
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        with self._lock:
+            expires_at = time.monotonic() + self.tombstone_ttl
+            for key in keys:
+                self._store(key, TOMBSTONE, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._cleared_until = time.monotonic() + self.tombstone_ttl
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCache:
+    """Adapter over a Django cache alias (locmem, Redis, ...) with the LRUCache interface."""
+
+    def __init__(self, alias='default', ttl=300, prefix='', tombstone_ttl=5):
+        self.alias = alias
+        self.ttl = ttl
+        self.prefix = prefix
+        self.tombstone_ttl = tombstone_ttl
+        self.generation_key = prefix + 'generation'
+        # The generation this thread's last get() saw, for its add().
+        self._seen = threading.local()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return self.prefix + str(key)
+
+    def get(self, key):
+        # Shared backends may hold unrelated keys, so clear() bumps a
+        # generation counter instead of flushing. Entries carry the
+        # generation they were stored under and it comes back in the same
+        # get_many, so a lookup is one round trip.
+        cache_key = self._key(key)
+        found = self.backend.get_many([cache_key, self.generation_key])
+        generation = found.get(self.generation_key, 0)
+        self._seen.generation = generation
+        entry = found.get(cache_key)
+        if entry is None or entry[0] != generation:
+            return MISSING
+        return entry[1]
+
+    def _generation(self):
+        generation = getattr(self._seen, 'generation', None)
+        if generation is None:
+            generation = self.backend.get(self.generation_key, 0)
+        return generation
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(self._key(key), (self._generation(), value), self.ttl if ttl is None else ttl)
+
+    def add(self, key, value, ttl=None):
+        # Stored under the generation the caller's get() saw: if clear() ran
+        # since, the entry is already stale and reads treat it as a miss.
+        return self.backend.add(self._key(key), (self._generation(), value), self.ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        self.backend.set(self._key(key), (TOMBSTONE, None), self.tombstone_ttl)
+
+    def delete_many(self, keys):
+        self.backend.set_many({self._key(key): (TOMBSTONE, None) for key in keys}, self.tombstone_ttl)
+
+    def clear(self):
+        self.backend.add(self.generation_key, 0, None)
+        self.backend.incr(self.generation_key)
+
+
+class BroadcastCache:
+    """A local cache whose invalidations also reach other workers (see module docstring)."""
+
+    def __init__(self, local, alias, interval=1.0, prefix=''):
+        self.local = local
+        self.alias = alias
+        self.interval = interval
+        self.generation_key = prefix + 'invalidations'
+        self._generation = None
+        self._next_check = 0.0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _sync(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.interval
+        generation = self.backend.get(self.generation_key, 0)
+        if generation != self._generation:
+            self._generation = generation
+            self.local.clear()
+
+    def _broadcast(self):
+        self.backend.add(self.generation_key, 0, None)
+        self.backend.incr(self.generation_key)
+
+    def get(self, key):
+        self._sync()
+        return self.local.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        return self.local.add(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self._broadcast()
+
+    def delete_many(self, keys):
+        # One broadcast for the whole batch.
+        self.local.delete_many(keys)
+        self._broadcast()
+
+    def clear(self):
+        self.local.clear()
+        self._broadcast()
+
+
+class NullCache:
+    def get(self, key):
+        return MISSING
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def add(self, key, value, ttl=None):
+        return False
+
+    def delete(self, key):
+        pass
+
+    def delete_many(self, keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+def build_cache(config, prefix):
+    backend = config.get('BACKEND', 'local')
+    ttl = config.get('TTL', 300)
+    tombstone_ttl = config.get('TOMBSTONE_TTL', 5)
+    if backend == 'local':
+        cache = LRUCache(max_size=config.get('MAX_SIZE', 1024), ttl=ttl, tombstone_ttl=tombstone_ttl)
+        if config.get('INVALIDATION_ALIAS'):
+            return BroadcastCache(cache, config['INVALIDATION_ALIAS'], config.get('INVALIDATION_INTERVAL', 1.0), prefix=prefix)
+        return cache
+    if backend == 'django':
+        return DjangoCache(alias=config.get('ALIAS', 'default'), ttl=ttl, prefix=prefix, tombstone_ttl=tombstone_ttl)
+    if backend is None:
+        return NullCache()
+    raise ValueError(f'Unknown cache backend: {backend}')
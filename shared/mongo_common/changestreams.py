@@ -0,0 +1,250 @@
+"""
+Change-stream driven cache invalidation.
+
+Each worker process runs one background thread per registered
+``ChangeStreamConsumer``. The thread watches a collection and hands every
+change event to the consumer's handler, so cached entries are dropped
+whether the write came from this worker, another one or something outside
+the API. Change streams need a replica set; a single-node one
+(``mongod --replSet rs0`` plus ``rs.initiate()``) is enough locally.
+
+Most handlers act on state that belongs to the worker (a local LRU, the
+category catalog), so every worker consumes the stream itself. It starts
+from "now", resetting first (for a cache that just started, clearing what
+is already empty), and keeps the resume token in memory to reconnect
+without a gap. A restarted worker has nothing of its predecessor's to keep
+in sync, so nothing is stored.
+
+A consumer created with ``shared=True`` acts on state every worker shares
+(e.g. a cache on a Django cache alias). One worker at a time consumes it,
+holding a lease of ``MONGO_CHANGE_STREAM_LEASE_TTL`` seconds on its document
+in ``MONGO_CHANGE_STREAM_TOKENS_COLLECTION``; the others retry the lease as
+it expires. The holder saves the resume token there every
+``MONGO_CHANGE_STREAM_TOKEN_SAVE_INTERVAL`` seconds, renewing the lease, so
+the next holder picks up where the stream left off. When there is nothing to
+resume from (first start, token aged out of the oplog, collection dropped),
+the consumer resets instead.
+
+Threads are started lazily, on first use in each process, like the client
+in ``mongo_config``. A server that forks after import starts them in every
+child and not in the parent.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+from .metrics import long_polling
+from .mongo_config import get_collection
+
+logger = logging.getLogger(__name__)
+
+# $changeStream is only supported on replica sets / sharded clusters.
+NOT_SUPPORTED = 40573
+# The resume point is gone (oplog rolled over, token from another cluster).
+HISTORY_LOST = (260, 280, 286)
+# Events after which individual keys can no longer be trusted.
+RESET_OPERATIONS = ('drop', 'rename', 'dropDatabase', 'invalidate')
+
+
+def enabled():
+    return getattr(settings, 'MONGO_CHANGE_STREAMS', False)
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class ChangeStreamConsumer:
+    """Watches one collection and calls ``on_change(event)`` / ``on_reset()`` from a daemon thread."""
+
+    def __init__(self, name, collection_name, on_change, on_reset, pipeline=None, full_document=None, shared=False):
+        self.name = name
+        self.collection_name = collection_name
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self.pipeline = pipeline or []
+        self.full_document = full_document
+        self.shared = shared
+        self.reinit()
+
+    def reinit(self):
+        # Also used after fork: the parent's thread does not exist in the child.
+        self._thread = None
+        self._stop = threading.Event()
+        self.token = None
+        self.events = 0
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self.leased = False
+
+    def tokens(self):
+        return get_collection(getattr(settings, 'MONGO_CHANGE_STREAM_TOKENS_COLLECTION', 'change_stream_tokens'))
+
+    def lease_expiry(self):
+        return datetime.now(timezone.utc) + timedelta(seconds=getattr(settings, 'MONGO_CHANGE_STREAM_LEASE_TTL', 10.0))
+
+    def acquire_lease(self):
+        # Taken when free, expired or already ours; the upsert of a held
+        # lease collides on _id instead of stealing it.
+        try:
+            self.tokens().update_one(
+                {'_id': self.name, '$or': [
+                    {'owner': self.owner},
+                    {'lease_until': {'$lt': datetime.now(timezone.utc)}},
+                    {'lease_until': {'$exists': False}},
+                ]},
+                {'$set': {'owner': self.owner, 'lease_until': self.lease_expiry()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def load_token(self):
+        document = self.tokens().find_one({'_id': self.name})
+        return document.get('token') if document else None
+
+    def save_token(self, token):
+        result = self.tokens().update_one(
+            {'_id': self.name, 'owner': self.owner},
+            {'$set': {'token': token, 'lease_until': self.lease_expiry(), 'updated_at': datetime.now(timezone.utc)}}
+        )
+        if not result.matched_count:
+            raise LeaseLost(self.name)
+
+    def checkpoint(self, token):
+        if self.shared:
+            self.save_token(token)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=f'changestream-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        retry_interval = getattr(settings, 'MONGO_CHANGE_STREAM_RETRY_INTERVAL', 5.0)
+        long_polling.set(True)
+        while not self._stop.is_set():
+            try:
+                if self.shared and not self.leased:
+                    if not self.acquire_lease():
+                        self._stop.wait(getattr(settings, 'MONGO_CHANGE_STREAM_LEASE_TTL', 10.0) / 2)
+                        continue
+                    self.leased = True
+                    self.token = self.load_token()
+                self.consume()
+            except LeaseLost:
+                # Another worker took over (this one stalled past the TTL);
+                # its stream covers everything from the saved token on.
+                logger.warning('Change stream %s lease was taken over', self.name)
+                self.leased = False
+            except OperationFailure as e:
+                if e.code == NOT_SUPPORTED:
+                    logger.warning('Change streams are not supported by this deployment; %s invalidation is off: %s', self.name, e)
+                    return
+                if e.code in HISTORY_LOST:
+                    logger.warning('Change stream %s cannot resume (%s); starting over', self.name, e)
+                    self.token = None
+                    continue
+                logger.warning('Change stream %s failed: %s', self.name, e)
+                self._stop.wait(retry_interval)
+            except PyMongoError as e:
+                logger.warning('Change stream %s failed: %s', self.name, e)
+                self._stop.wait(retry_interval)
+            except Exception:
+                logger.exception('Change stream %s handler failed', self.name)
+                self._stop.wait(retry_interval)
+
+    def consume(self):
+        save_interval = getattr(settings, 'MONGO_CHANGE_STREAM_TOKEN_SAVE_INTERVAL', 1.0)
+        with get_collection(self.collection_name).watch(
+            self.pipeline,
+            resume_after=self.token,
+            full_document=self.full_document,
+            max_await_time_ms=getattr(settings, 'MONGO_CHANGE_STREAM_MAX_AWAIT_MS', 1000),
+        ) as stream:
+            if self.token is None:
+                # Opened before resetting, so nothing written in between is missed.
+                self.on_reset()
+            saved_at = 0.0
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self.events += 1
+                    if change['operationType'] in RESET_OPERATIONS:
+                        self.on_reset()
+                    else:
+                        self.on_change(change)
+                    if change['operationType'] == 'invalidate':
+                        # The stream is over and cannot be resumed past this event.
+                        self.token = None
+                        return
+                self.token = stream.resume_token
+                if time.monotonic() - saved_at >= save_interval:
+                    self.checkpoint(self.token)
+                    saved_at = time.monotonic()
+            self.checkpoint(self.token)
+
+    def status(self):
+        return {
+            'name': self.name,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'consuming': not self.shared or self.leased,
+            'events': self.events,
+        }
+
+
+_consumers = []
+_pid = None
+_lock = threading.Lock()
+
+
+def register(consumer):
+    _consumers.append(consumer)
+    return consumer
+
+
+def ensure_started():
+    global _pid
+    pid = os.getpid()
+    if _pid == pid or not _consumers:
+        return
+    with _lock:
+        if _pid != pid:
+            _pid = pid
+            for consumer in _consumers:
+                consumer.start()
+
+
+def stop_all(timeout=None):
+    for consumer in _consumers:
+        consumer.stop(timeout)
+
+
+def status():
+    return [consumer.status() for consumer in _consumers]
+
+
+def _forget_threads_after_fork():
+    global _pid, _lock
+    _pid = None
+    _lock = threading.Lock()
+    for consumer in _consumers:
+        consumer.reinit()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_threads_after_fork)
@@ -0,0 +1,201 @@
+"""
+Content-negotiated response compression.
+
+A replacement for ``django.middleware.gzip.GZipMiddleware`` that picks the
+best encoding the client accepts from ``COMPRESSION_ENCODINGS`` (zstd and
+brotli when the ``zstandard`` / ``brotli`` packages are installed, gzip
+always), leaves bodies under ``COMPRESSION_MIN_SIZE`` alone, and compresses
+streamed responses incrementally, flushing every
+``COMPRESSION_STREAM_FLUSH_SIZE`` bytes of input so streamed rows still
+reach the client promptly.
+"""
+
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript')
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+    def stream(self):
+        compressor = brotli.Compressor(quality=self.level)
+        return compressor.process, compressor.flush, compressor.finish
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush
+        )
+
+
+CODECS = {'gzip': GzipCodec}
+if brotli is not None:
+    CODECS['br'] = BrotliCodec
+if zstandard is not None:
+    CODECS['zstd'] = ZstdCodec
+
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+
+def available_codecs(levels=None):
+    levels = {**DEFAULT_LEVELS, **(levels or {})}
+    return {name: codec(levels[name]) for name, codec in CODECS.items()}
+
+
+def parse_accept_encoding(header):
+    # ``gzip;q=0.5, br`` -> {'gzip': 0.5, 'br': 1.0}
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(header, codecs, preference):
+    accepted = parse_accept_encoding(header)
+    for name in preference:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if name in codecs and quality > 0:
+            return codecs[name]
+    return None
+
+
+def compress_stream(chunks, codec, flush_size):
+    compress, flush, finish = codec.stream()
+    pending = 0
+    for chunk in chunks:
+        output = compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            output += flush()
+            pending = 0
+        if output:
+            yield output
+    yield finish()
+
+
+async def compress_async_stream(chunks, codec, flush_size):
+    compress, flush, finish = codec.stream()
+    pending = 0
+    async for chunk in chunks:
+        output = compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            output += flush()
+            pending = 0
+        if output:
+            yield output
+    yield finish()
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.codecs = available_codecs(getattr(settings, 'COMPRESSION_LEVELS', None))
+        self.preference = getattr(settings, 'COMPRESSION_ENCODINGS', ['zstd', 'br', 'gzip'])
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.flush_size = getattr(settings, 'COMPRESSION_STREAM_FLUSH_SIZE', 16384)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def _acall(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs, self.preference)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_async_stream(response.streaming_content, codec, self.flush_size)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, codec, self.flush_size)
+            del response.headers['Content-Length']
+        else:
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codec.name
+        return response
@@ -0,0 +1,81 @@
+"""
+Index declarations and query-plan checks.
+
+Models declare their indexes as ``INDEXES`` (lists of ``IndexModel``) and
+the filters their read paths issue through ``query_shapes()``.
+``build_indexes`` creates the declared indexes with one createIndexes
+command per collection, which is a no-op for indexes that already exist.
+``drop_indexes`` removes indexes a model lists as superseded; only
+``manage.py ensure_indexes`` calls it, never web-process startup.
+``verify_query_plans`` runs each shape through ``explain()`` and flags every
+one whose winning plan scans the whole collection or, for shapes with a
+sort, sorts in memory instead of walking an index in order.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def build_indexes(collection, indexes):
+    return collection.create_indexes(indexes)
+
+
+def drop_indexes(collection, names):
+    existing = set(collection.index_information())
+    dropped = [name for name in names if name in existing]
+    for name in dropped:
+        collection.drop_index(name)
+    return dropped
+
+
+def plan_stages(plan):
+    # Stage names anywhere in a winning plan, classic or slot-based engine.
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if 'stage' in node:
+            stages.append(node['stage'])
+        for key in ('inputStage', 'queryPlan', 'innerStage', 'outerStage'):
+            if key in node:
+                pending.append(node[key])
+        pending.extend(node.get('inputStages', []))
+    return stages
+
+
+def explain(collection, query, sort=None):
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return cursor.explain()['queryPlanner']['winningPlan']
+
+
+def verify_query_plans(shapes):
+    # ``shapes`` holds (name, collection, query, sort) tuples.
+    results = []
+    for name, collection, query, sort in shapes:
+        stages = plan_stages(explain(collection, query, sort))
+        results.append({
+            'query': name,
+            'collection': collection.name,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+            'in_memory_sort': bool(sort) and 'SORT' in stages,
+        })
+    return results
+
+
+def plan_problem(result):
+    if result['collscan']:
+        return 'COLLSCAN'
+    if result['in_memory_sort']:
+        return 'in-memory SORT'
+    return None
+
+
+def log_bad_plans(results):
+    bad = [result for result in results if plan_problem(result)]
+    for result in bad:
+        logger.error('Query %s on %s would run as a %s: %s', result['query'], result['collection'], plan_problem(result), result['stages'])
+    return bad
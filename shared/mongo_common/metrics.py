@@ -0,0 +1,275 @@
+"""
+In-process request and MongoDB metrics, exposed in the Prometheus text format.
+
+``MetricsMiddleware`` times every request per view, and ``command_listener``
+(registered on the Mongo client by ``mongo_config``) times every Mongo
+command and counts the round trips made while serving each request. The data
+lives in this worker's memory; each worker serves its own ``/metrics``.
+
+A streaming response's body is produced after the middleware returns, so
+its Mongo commands are attributed to the request while each chunk is
+generated, and the request is recorded when the response is closed.
+
+Change-stream consumers long poll: their getMores wait up to
+``MONGO_CHANGE_STREAM_MAX_AWAIT_MS`` by design. Commands from those threads
+are timed under ``mongo_change_stream_command_duration_seconds`` so they do
+not skew ``mongo_command_duration_seconds``.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def reset_lock(self):
+        # A lock held by another thread at fork time would stay held in the child.
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self, gauges=None, counters=None):
+        # ``gauges`` and ``counters`` are point-in-time values read from
+        # elsewhere (pool stats, change streams) rather than recorded here.
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counted = sorted(self._counters.items())
+            histograms = [(key, list(h.buckets), list(h.counts), h.sum, h.count) for key, h in histograms]
+        seen = set()
+        for (name, labels), buckets, counts, total, count in histograms:
+            self._header(lines, seen, name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {count}')
+            lines.append(f'{name}_sum{_labels(labels)} {total}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+        for (name, labels), value in counted:
+            self._header(lines, seen, name, 'counter')
+            lines.append(f'{name}{_labels(labels)} {value}')
+        for name, value in sorted((counters or {}).items()):
+            self._header(lines, seen, name, 'counter')
+            lines.append(f'{name} {value}')
+        for name, value in sorted((gauges or {}).items()):
+            self._header(lines, seen, name, 'gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, lines, seen, name, metric_type):
+        if name in seen:
+            return
+        seen.add(name)
+        if name in self._help:
+            lines.append(f'# HELP {name} {self._help[name]}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+registry = Registry()
+registry.describe('http_request_duration_seconds', 'Time spent producing a response, per view.')
+registry.describe('http_request_mongo_round_trips', 'Mongo commands issued while serving one request, per view.')
+registry.describe('http_request_mongo_seconds', 'Time spent in Mongo commands while serving one request, per view.')
+registry.describe('mongo_command_duration_seconds', 'Mongo command latency, per command.')
+registry.describe('mongo_command_failures_total', 'Failed Mongo commands, per command.')
+registry.describe('mongo_change_stream_command_duration_seconds', 'Latency of change-stream consumer commands (long polls), per command.')
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.reset_lock)
+
+
+class RequestStats:
+    __slots__ = ('round_trips', 'mongo_seconds')
+
+    def __init__(self):
+        self.round_trips = 0
+        self.mongo_seconds = 0.0
+
+
+current_request = contextvars.ContextVar('current_request_metrics', default=None)
+
+# Set by the change-stream consumer threads (see module docstring).
+long_polling = contextvars.ContextVar('mongo_long_polling', default=False)
+
+
+class _MeteredContent:
+    # Wraps a streaming body so each chunk is produced with the request's
+    # stats current (the context may differ between chunks). Django registers
+    # ``close`` as a resource closer of the response, so ``on_close`` runs
+    # once the server is done with it.
+    def __init__(self, content, stats, on_close):
+        self._content = content
+        self._stats = stats
+        self._on_close = on_close
+
+    def close(self):
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+
+class _MeteredStream(_MeteredContent):
+    def __iter__(self):
+        self._iterator = iter(self._content)
+        return self
+
+    def __next__(self):
+        token = current_request.set(self._stats)
+        try:
+            return next(self._iterator)
+        finally:
+            current_request.reset(token)
+
+
+class _MeteredAsyncStream(_MeteredContent):
+    def __aiter__(self):
+        self._iterator = aiter(self._content)
+        return self
+
+    async def __anext__(self):
+        token = current_request.set(self._stats)
+        try:
+            return await anext(self._iterator)
+        finally:
+            current_request.reset(token)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        registry.inc('mongo_command_failures_total', (('command', event.command_name),))
+        self._record(event)
+
+    def _record(self, event):
+        seconds = event.duration_micros / 1e6
+        if long_polling.get():
+            registry.observe('mongo_change_stream_command_duration_seconds', (('command', event.command_name),), seconds)
+            return
+        registry.observe('mongo_command_duration_seconds', (('command', event.command_name),), seconds)
+        stats = current_request.get()
+        if stats is not None:
+            stats.round_trips += 1
+            stats.mongo_seconds += seconds
+
+
+command_listener = MongoCommandListener()
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self._finish(request, response, stats, started)
+
+    async def _acall(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self._finish(request, response, stats, started)
+
+    def _finish(self, request, response, stats, started):
+        if not response.streaming:
+            self._record(request, response, stats, time.perf_counter() - started)
+            return response
+        # Closed by the server once the body is sent (or the client went away).
+        stream = _MeteredAsyncStream if response.is_async else _MeteredStream
+        response.streaming_content = stream(
+            response.streaming_content,
+            stats,
+            lambda: self._record(request, response, stats, time.perf_counter() - started)
+        )
+        return response
+
+    def _record(self, request, response, stats, seconds):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        registry.observe(
+            'http_request_duration_seconds',
+            (('view', view), ('method', request.method), ('status', response.status_code)),
+            seconds
+        )
+        registry.observe('http_request_mongo_round_trips', (('view', view),), stats.round_trips, ROUND_TRIP_BUCKETS)
+        registry.observe('http_request_mongo_seconds', (('view', view),), stats.mongo_seconds)
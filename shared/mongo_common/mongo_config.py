@@ -0,0 +1,222 @@
+"""
+MongoDB client management.
+
+One ``MongoClient`` per worker process, configured from the ``MONGO_*``
+settings. The client is created lazily on first use and dropped in forked
+children, so servers that fork after import (gunicorn, uwsgi) never share
+sockets between processes. Startup work that needs the server (index
+builds, warm-up loads) is registered with ``on_first_request`` instead of
+running in ``AppConfig.ready()``, so manage.py commands never wait on it.
+It runs in a background thread, so requests do not wait on it either.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from pymongo import MongoClient, monitoring
+
+from .metrics import command_listener
+
+logger = logging.getLogger(__name__)
+
+CLIENT_SETTINGS = {
+    'MONGO_MAX_POOL_SIZE': 'maxPoolSize',
+    'MONGO_MIN_POOL_SIZE': 'minPoolSize',
+    'MONGO_MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'MONGO_CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+    'MONGO_SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+    'MONGO_READ_PREFERENCE': 'readPreference',
+    'MONGO_COMPRESSORS': 'compressors',
+}
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks connection checkouts and how long callers waited for them."""
+
+    def __init__(self):
+        self.reinit()
+
+    def reinit(self):
+        # Also used after fork, where a lock held by another parent thread
+        # would otherwise stay locked forever in the child.
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checked_out = 0
+            self.open_connections = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.pools_cleared = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checked_out': self.checked_out,
+                'open_connections': self.open_connections,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'wait_time_total_ms': round(self.wait_time_total * 1000, 3),
+                'wait_time_avg_ms': round(self.wait_time_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_time_max_ms': round(self.wait_time_max * 1000, 3),
+                'pools_cleared': self.pools_cleared,
+            }
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, 'started', time.perf_counter())
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+pool_listener = PoolStatsListener()
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def client_options():
+    options = {'connect': False, 'event_listeners': [pool_listener, command_listener]}
+    for setting, option in CLIENT_SETTINGS.items():
+        value = getattr(settings, setting, None)
+        if value not in (None, [], ''):
+            options[option] = value
+    options.update(getattr(settings, 'MONGO_WRITE_CONCERN', None) or {})
+    return options
+
+
+def get_client():
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = MongoClient(settings.MONGO_URI, **client_options())
+                _client_pid = pid
+    return _client
+
+
+def set_client(client):
+    # Replace this process's client, e.g. with mongomock for benchmarks.
+    global _client, _client_pid
+    with _lock:
+        _client = client
+        _client_pid = os.getpid()
+
+
+def get_db():
+    return get_client()[settings.MONGO_DB_NAME]
+
+
+def get_collection(name):
+    return get_db()[name]
+
+
+def on_first_request(func, dispatch_uid):
+    # Starts ``func`` in a background thread when this process begins its
+    # first request. It only counts as done once it returns: when it raises,
+    # a later request starts it again, at most every
+    # MONGO_STARTUP_RETRY_INTERVAL seconds. Forked workers each run it for
+    # themselves.
+    processes = {}
+
+    def run(state):
+        try:
+            func()
+        except Exception:
+            logger.exception('Startup task %s failed; retrying on a later request', dispatch_uid)
+            with state['lock']:
+                state['running'] = False
+                state['failed_at'] = time.monotonic()
+        else:
+            with state['lock']:
+                state['running'] = False
+                state['done'] = True
+
+    def receiver(sender, **kwargs):
+        pid = os.getpid()
+        state = processes.get(pid)
+        if state is None:
+            processes.clear()
+            state = processes.setdefault(pid, {'lock': threading.Lock(), 'done': False, 'running': False, 'failed_at': None})
+        if state['done'] or state['running']:
+            return
+        with state['lock']:
+            if state['done'] or state['running']:
+                return
+            failed_at = state['failed_at']
+            if failed_at is not None and time.monotonic() - failed_at < getattr(settings, 'MONGO_STARTUP_RETRY_INTERVAL', 30.0):
+                return
+            state['running'] = True
+        threading.Thread(target=run, args=(state,), name=f'startup-{dispatch_uid}', daemon=True).start()
+
+    request_started.connect(receiver, dispatch_uid=dispatch_uid, weak=False)
+
+
+def pool_stats():
+    stats = pool_listener.snapshot()
+    stats['pid'] = os.getpid()
+    stats['max_pool_size'] = getattr(settings, 'MONGO_MAX_POOL_SIZE', 100)
+    return stats
+
+
+def _forget_client_after_fork():
+    # The parent's sockets must not be used (or closed) by the child; drop the
+    # reference and let the child build its own client on first use.
+    global _client, _client_pid, _lock
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+    pool_listener.reinit()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_client_after_fork)
@@ -0,0 +1,26 @@
+from django.http import HttpResponse, JsonResponse
+
+from . import changestreams, mongo_config
+from .metrics import registry
+
+
+def mongo_pool_stats(request):
+    return JsonResponse(mongo_config.pool_stats())
+
+
+def metrics(request):
+    pool = mongo_config.pool_stats()
+    gauges = {
+        'mongo_pool_checked_out_connections': pool['checked_out'],
+        'mongo_pool_open_connections': pool['open_connections'],
+        'mongo_pool_wait_seconds_max': pool['wait_time_max_ms'] / 1000,
+    }
+    counters = {
+        'mongo_pool_checkouts_total': pool['checkouts'],
+        'mongo_pool_checkout_failures_total': pool['checkout_failures'],
+        'mongo_pool_wait_seconds_total': pool['wait_time_total_ms'] / 1000,
+    }
+    for consumer in changestreams.status():
+        gauges[f"mongo_change_stream_{consumer['name']}_running"] = int(consumer['running'])
+        counters[f"mongo_change_stream_{consumer['name']}_events_total"] = consumer['events']
+    return HttpResponse(registry.render(gauges, counters), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'mongo_common.metrics.MetricsMiddleware',
+    'mongo_common.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,6 +83,85 @@ DATABASES = {
 }
 
 
+# MongoDB
+# Client options, see mongo_common/mongo_config.py. Each worker process builds
+# its own client after fork; None leaves the PyMongo default in place.
+MONGO_URI = 'mongodb://localhost:27017/'
+MONGO_DB_NAME = 'studentsdb'
+MONGO_MAX_POOL_SIZE = 100
+MONGO_MIN_POOL_SIZE = 0
+MONGO_MAX_IDLE_TIME_MS = 60000
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+MONGO_CONNECT_TIMEOUT_MS = 5000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+MONGO_SOCKET_TIMEOUT_MS = None
+MONGO_READ_PREFERENCE = 'primary'
+MONGO_WRITE_CONCERN = {'w': 1}
+MONGO_COMPRESSORS = None  # e.g. 'zstd,snappy,zlib'
+# Build the declared indexes when each worker handles its first request
+# (not at import, so manage.py commands never wait on MongoDB), in a
+# background thread. A failed build is retried by a later request at most
+# every MONGO_STARTUP_RETRY_INTERVAL seconds. To build them at deploy time
+# with manage.py ensure_indexes instead, set this to False.
+MONGO_ENSURE_INDEXES_ON_STARTUP = True
+MONGO_STARTUP_RETRY_INTERVAL = 30.0
+# Also explain() every declared query shape then and log an error for any
+# COLLSCAN (manage.py ensure_indexes does the same and fails instead).
+MONGO_VERIFY_QUERY_PLANS_ON_STARTUP = False
+
+# Batched multi-get endpoint (/api/students/batch/)
+BATCH_MAX_IDS = 500
+
+# Bulk import/export (/api/students/import/, /api/students/export/,
+# manage.py import_students / export_students). Exports read the cursor
+# EXPORT_BATCH_SIZE documents at a time.
+BULK_CHUNK_SIZE = 1000
+BULK_MAX_REPORTED_ERRORS = 1000
+EXPORT_BATCH_SIZE = 1000
+
+# Read-through cache for Student.get_by_id (see students/cache.py and
+# mongo_common/cache.py). BACKEND is 'local' (per-process LRU), 'django' (the
+# CACHES alias named by ALIAS) or None to disable. Misses are cached for
+# NEGATIVE_TTL seconds. For TOMBSTONE_TTL seconds after a write the student is
+# not cached again, so a read that started before it cannot cache the old
+# document. With 'local', INVALIDATION_ALIAS names a shared cache used to
+# invalidate other workers' entries within INVALIDATION_INTERVAL seconds of a
+# write.
+STUDENT_CACHE = {
+    'BACKEND': 'local',
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    'NEGATIVE_TTL': 30,
+    'TOMBSTONE_TTL': 5,
+    'ALIAS': 'default',
+    'INVALIDATION_ALIAS': None,
+    'INVALIDATION_INTERVAL': 1.0,
+}
+
+# Invalidate STUDENT_CACHE entries from a MongoDB change stream, so every
+# worker drops entries written by other workers or outside the API (see
+# mongo_common/changestreams.py). Needs a replica set. Each worker follows
+# the stream from its own start; for a shared ('django') cache one worker,
+# holding a LEASE_TTL-second lease, follows it and keeps its resume token in
+# MONGO_CHANGE_STREAM_TOKENS_COLLECTION. With the stream running, the cache
+# TTL only bounds staleness while the stream is down.
+MONGO_CHANGE_STREAMS = False
+MONGO_CHANGE_STREAM_TOKENS_COLLECTION = 'change_stream_tokens'
+MONGO_CHANGE_STREAM_TOKEN_SAVE_INTERVAL = 1.0
+MONGO_CHANGE_STREAM_MAX_AWAIT_MS = 1000
+MONGO_CHANGE_STREAM_RETRY_INTERVAL = 5.0
+MONGO_CHANGE_STREAM_LEASE_TTL = 10.0
+
+# Response compression (see mongo_common/compression.py). Encodings in server
+# preference order; zstd and br are used when the zstandard / brotli packages
+# are installed. Bodies smaller than COMPRESSION_MIN_SIZE bytes go out as is;
+# streamed responses are flushed every COMPRESSION_STREAM_FLUSH_SIZE bytes.
+COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_STREAM_FLUSH_SIZE = 16384
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,5 +1,8 @@
 from django.urls import path, include
+from mongo_common.views import metrics, mongo_pool_stats
 
 urlpatterns = [
     path('api/', include('students.urls')),
-]
\ No newline at end of file
+    path('api/mongo/pool-stats/', mongo_pool_stats, name='mongo-pool-stats'),
+    path('metrics', metrics, name='metrics'),
+]
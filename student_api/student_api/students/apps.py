@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        if getattr(settings, 'MONGO_CHANGE_STREAMS', False):
+            from .cache import watch_students
+            watch_students()
+        from mongo_common.mongo_config import on_first_request
+        on_first_request(self.prepare, dispatch_uid='students.prepare')
+
+    def prepare(self):
+        if not getattr(settings, 'MONGO_ENSURE_INDEXES_ON_STARTUP', True):
+            return
+        from .models import Student
+        from mongo_common.indexes import log_bad_plans, verify_query_plans
+        Student.ensure_indexes()
+        if getattr(settings, 'MONGO_VERIFY_QUERY_PLANS_ON_STARTUP', False):
+            log_bad_plans(verify_query_plans(Student.query_shapes()))
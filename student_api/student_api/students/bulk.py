@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from mongo_common.bulk import BULK_FORMATS, chunks, parse
+from .models import Student
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+EXPORT_FIELDS = ('id', 'name', 'age', 'email')
+
+
+def validate(data):
+    # Returns (student document, None) or (None, {field: [messages]}).
+    errors = {}
+    name = data.get('name')
+    if not isinstance(name, str) or not name.strip():
+        errors['name'] = ['This field is required.']
+    age = data.get('age')
+    try:
+        if isinstance(age, bool) or age in (None, ''):
+            raise ValueError
+        age = int(age)
+        if age < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors['age'] = ['Age must be a non-negative integer.']
+    email = data.get('email')
+    try:
+        if not isinstance(email, str):
+            raise ValidationError('Enter a valid email address.')
+        email = email.strip()
+        validate_email(email)
+    except ValidationError as e:
+        errors['email'] = list(e.messages)
+    student_id = data.get('id')
+    if student_id is not None and (not isinstance(student_id, str) or not student_id.strip()):
+        errors['id'] = ['id must be a non-empty string.']
+    if errors:
+        return None, errors
+    return {
+        '_id': Student.normalize(student_id) if student_id else str(uuid.uuid4()),
+        'name': name.strip(),
+        'age': age,
+        'email': email,
+    }, None
+
+
+def ingest(rows, chunk_size=None):
+    """Validate and insert ``(row_number, data, parse_error)`` tuples chunk by chunk."""
+    chunk_size = chunk_size or getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+    max_errors = getattr(settings, 'BULK_MAX_REPORTED_ERRORS', 1000)
+    summary = {'received': 0, 'inserted': 0, 'error_count': 0, 'errors': []}
+
+    def report(row_number, errors):
+        summary['error_count'] += 1
+        if len(summary['errors']) < max_errors:
+            summary['errors'].append({'row': row_number, 'errors': errors})
+
+    for chunk in chunks(rows, chunk_size):
+        valid = []
+        for row_number, data, parse_error in chunk:
+            summary['received'] += 1
+            if parse_error:
+                report(row_number, parse_error)
+                continue
+            student, errors = validate(data)
+            if errors:
+                report(row_number, errors)
+                continue
+            valid.append((row_number, student))
+
+        # Earlier chunks are already inserted, so one lookup per chunk also
+        # catches duplicates across the whole file.
+        taken = Student.existing_emails(student['email'] for _, student in valid)
+        row_numbers = []
+        students = []
+        for row_number, student in valid:
+            email = Student.normalize(student['email'])
+            if email in taken:
+                report(row_number, {'email': ['A student with this email already exists.']})
+                continue
+            taken.add(email)
+            row_numbers.append(row_number)
+            students.append(student)
+
+        inserted, write_errors = Student.bulk_insert(students)
+        summary['inserted'] += inserted
+        for index, message in write_errors:
+            report(row_numbers[index], message)
+    return summary
+
+
+def export_ndjson(students):
+    for student in students:
+        yield json.dumps({field: student.get(field) for field in EXPORT_FIELDS}) + '\n'
+
+
+def export_csv(students):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for student in students:
+        writer.writerow(student)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export(query, data_format, batch_size=None):
+    # Yields text chunks; memory stays at one cursor batch whatever the size.
+    batch_size = batch_size or getattr(settings, 'EXPORT_BATCH_SIZE', 1000)
+    students = Student.iter_find(query, batch_size=batch_size)
+    if data_format == 'csv':
+        return export_csv(students)
+    return export_ndjson(students)
@@ -0,0 +1,55 @@
+"""
+Read-through cache for Student.get_by_id.
+
+Built from ``STUDENT_CACHE`` by ``mongo_common.cache.build_cache``, like the
+category cache in the product API. Lookups that found nothing are cached
+too, as ``None`` with their own shorter TTL, so repeated probes for unknown
+ids stop reaching Mongo.
+
+With ``MONGO_CHANGE_STREAMS`` on, entries are also dropped as the students
+change stream reports writes (see ``mongo_common/changestreams.py``),
+including writes made outside the API: by every worker for a local cache,
+by one elected worker for a shared one.
+"""
+
+from django.conf import settings
+
+from mongo_common import changestreams
+from mongo_common.cache import MISSING, BroadcastCache, build_cache
+
+_student_cache = None
+
+
+def get_student_cache():
+    global _student_cache
+    if _student_cache is None:
+        _student_cache = build_cache(getattr(settings, 'STUDENT_CACHE', {}), prefix='student:')
+    changestreams.ensure_started()
+    return _student_cache
+
+
+def apply_change(change):
+    # Every worker sees the same event, so a BroadcastCache only drops its
+    # local entry instead of broadcasting again. Inserts count too: the id
+    # may be cached as a miss.
+    cache = get_student_cache()
+    if isinstance(cache, BroadcastCache):
+        cache = cache.local
+    cache.delete(change['documentKey']['_id'])
+
+
+def watch_students():
+    return changestreams.register(changestreams.ChangeStreamConsumer(
+        'students',
+        'students',
+        apply_change,
+        lambda: get_student_cache().clear(),
+        pipeline=[{'$project': {'operationType': 1, 'documentKey': 1}}],
+        # A cache on a Django alias is shared by every worker; one of them
+        # invalidating it is enough.
+        shared=getattr(settings, 'STUDENT_CACHE', {}).get('BACKEND', 'local') == 'django',
+    ))
+
+
+def negative_ttl():
+    return getattr(settings, 'STUDENT_CACHE', {}).get('NEGATIVE_TTL', 30)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Populate the lowercased name/email lookup fields on existing students and create their indexes.'
+
+    def handle(self, *args, **options):
+        Student.ensure_indexes()
+        updated = Student.backfill_shadow_fields()
+        self.stdout.write(self.style.SUCCESS(f'Backfilled lookup fields on {updated} students'))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.bulk import export
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Stream students to an NDJSON or CSV file, optionally filtered by name, age or email.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write, or - for stdout')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], help='Defaults to the file extension, else ndjson')
+        parser.add_argument('--batch-size', type=int, default=None, help='Cursor batch size (default: EXPORT_BATCH_SIZE)')
+        parser.add_argument('--name')
+        parser.add_argument('--age', type=int)
+        parser.add_argument('--email')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        query = Student.build_query(name=options['name'], age=options['age'], email=options['email'])
+        chunks = export(query, data_format, batch_size=options['batch_size'])
+        try:
+            if path == '-':
+                sys.stdout.writelines(chunks)
+            else:
+                with open(path, 'w', newline='') as f:
+                    f.writelines(chunks)
+        except OSError as e:
+            raise CommandError(str(e))
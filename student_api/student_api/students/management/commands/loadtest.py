@@ -0,0 +1,111 @@
+import json
+import platform
+import random
+import time
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from mongo_common import benchmarking, mongo_config
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a benchmark database and report p50/p95/p99 latency, requests per second '
+        'and memory for the student endpoints as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help='Students to seed')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--db-name', help='Database to seed (default: <MONGO_DB_NAME>_bench, or MONGO_DB_NAME with --base-url)')
+        parser.add_argument('--mongomock', action='store_true', help='Use an in-memory mongomock client instead of MongoDB')
+        parser.add_argument('--base-url', help='Drive a running server over HTTP instead of the Django test client')
+        parser.add_argument('--no-seed', action='store_true', help='Reuse the data already in --db-name')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark database afterwards')
+        parser.add_argument('--only', help='Comma-separated endpoint names to run')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        if options['mongomock']:
+            if options['base_url']:
+                raise CommandError('--mongomock only applies to in-process runs')
+            benchmarking.use_mongomock()
+        if options['base_url'] and not options['no_seed']:
+            # The server reads its own database, not one seeded from here.
+            raise CommandError('--base-url needs --no-seed: seed the server\'s database first and point --db-name at it')
+        default_db_name = settings.MONGO_DB_NAME if options['base_url'] else f'{settings.MONGO_DB_NAME}_bench'
+        db_name = options['db_name'] or default_db_name
+        if db_name == settings.MONGO_DB_NAME and not options['no_seed']:
+            raise CommandError('Refusing to seed the application database; pick another --db-name or pass --no-seed')
+
+        with override_settings(MONGO_DB_NAME=db_name):
+            if not options['no_seed']:
+                self.seed(options['students'])
+            try:
+                results = self.run(options)
+            finally:
+                if not options['keep'] and not options['no_seed']:
+                    mongo_config.get_client().drop_database(db_name)
+
+        report = {
+            'service': 'student_api',
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'dataset': {'students': options['students']},
+            'requests_per_endpoint': options['requests'],
+            'concurrency': options['concurrency'],
+            'transport': 'http' if options['base_url'] else 'test-client',
+            'results': results,
+        }
+        self.stdout.write(benchmarking.write_report(report, options['output'], options['baseline']))
+
+    def seed(self, count):
+        Student.ensure_indexes()
+        rng = random.Random(42)
+        batch = []
+        for i in range(count):
+            batch.append(Student.with_shadow_fields({
+                '_id': str(uuid.uuid4()),
+                'name': f'Student {i}',
+                'age': rng.randint(17, 30),
+                'email': f'student{i}@example.com',
+            }))
+            if len(batch) == 1000:
+                Student.collection().insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            Student.collection().insert_many(batch, ordered=False)
+
+    def scenarios(self):
+        student = Student.collection().find_one({}, {'_id': 1, 'name': 1, 'email': 1})
+        return [
+            ('student-read', 'GET', f"/api/students/{student['_id']}/"),
+            ('student-list-by-id', 'GET', f"/api/students/?id={student['_id']}"),
+            ('student-list-by-email', 'GET', f"/api/students/?email={quote(student['email'].upper())}"),
+            ('student-list-by-name', 'GET', f"/api/students/?name={quote(student['name'])}"),
+            ('student-list-by-age', 'GET', '/api/students/?age=21'),
+            ('student-read-missing', 'GET', f'/api/students/{uuid.uuid4()}/'),
+        ]
+
+    def run(self, options):
+        only = set(options['only'].split(',')) if options['only'] else None
+        results = []
+        for name, method, path in self.scenarios():
+            if only and name not in only:
+                continue
+            if options['base_url']:
+                result = benchmarking.run_http(name, method, options['base_url'], path, options['requests'], options['concurrency'])
+            else:
+                result = benchmarking.run_test_client(name, method, path, options['requests'], options['concurrency'])
+            self.stderr.write(json.dumps(result))
+            if benchmarking.server_errors(result):
+                self.stderr.write(self.style.WARNING(f"{name}: {benchmarking.server_errors(result)} responses were server errors"))
+            results.append(result)
+        return results
@@ -1,3 +1,264 @@
-from django.db import models
+from pymongo import ASCENDING, IndexModel, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from mongo_common.indexes import build_indexes, drop_indexes
+from mongo_common.mongo_config import get_collection
+from .cache import MISSING, get_student_cache, negative_ttl
 
-# Create your models here.
+# Lowercased shadow copies of the case-insensitive lookup fields. They let
+# name/email lookups run as exact matches against an index instead of an
+# anchored case-insensitive $regex that has to scan the collection.
+SHADOW_FIELDS = {
+    'name': 'name_lower',
+    'email': 'email_lower',
+}
+
+DUPLICATE_KEY = 11000
+
+
+class DuplicateStudent(Exception):
+    def __init__(self, field):
+        super().__init__(f'A student with this {field} already exists')
+        self.field = field
+
+
+def duplicate_field(error):
+    # Which unique key a duplicate-key error (or bulk write error entry)
+    # hit: 'email', 'id' or None when the server did not say.
+    key_pattern = error.get('keyPattern') or {}
+    message = error.get('errmsg', '')
+    if 'email_lower' in key_pattern or 'index: email_lower' in message:
+        return 'email'
+    if '_id' in key_pattern or 'index: _id_' in message:
+        return 'id'
+    return None
+
+
+class Student:
+    INDEXES = [
+        IndexModel([('name_lower', ASCENDING)], name='name_lower'),
+        IndexModel([('age', ASCENDING)], name='age'),
+    ]
+    # One student per email, enforced by the index so concurrent imports and
+    # POSTs cannot both pass a check-then-insert. Partial, so documents
+    # written before the shadow fields existed do not all collide on null.
+    UNIQUE_INDEXES = [
+        IndexModel(
+            [('email_lower', ASCENDING)],
+            name='email_lower_unique',
+            unique=True,
+            partialFilterExpression={'email_lower': {'$exists': True}}
+        ),
+    ]
+    # Replaced by email_lower_unique. Dropped by manage.py ensure_indexes only.
+    OBSOLETE_INDEXES = ['email_lower']
+
+    @staticmethod
+    def collection():
+        return get_collection('students')
+
+    @staticmethod
+    def normalize(value):
+        return str(value).strip().lower()
+
+    @staticmethod
+    def with_shadow_fields(data):
+        document = dict(data)
+        for field, shadow in SHADOW_FIELDS.items():
+            if field in data and data[field] is not None:
+                document[shadow] = Student.normalize(data[field])
+        return document
+
+    @staticmethod
+    def to_public(document):
+        for shadow in SHADOW_FIELDS.values():
+            document.pop(shadow, None)
+        document['id'] = str(document.pop('_id'))
+        return document
+
+    @staticmethod
+    def ensure_indexes():
+        # Separate createIndexes commands, so existing duplicate emails only
+        # hold back the unique index.
+        build_indexes(Student.collection(), Student.INDEXES)
+        build_indexes(Student.collection(), Student.UNIQUE_INDEXES)
+
+    @staticmethod
+    def drop_obsolete_indexes():
+        return drop_indexes(Student.collection(), Student.OBSOLETE_INDEXES)
+
+    @staticmethod
+    def duplicate_emails(limit=20):
+        # Emails held by more than one student, which must be resolved
+        # before email_lower_unique can be built.
+        return list(Student.collection().aggregate([
+            {'$match': {'email_lower': {'$exists': True}}},
+            {'$group': {'_id': '$email_lower', 'count': {'$sum': 1}, 'ids': {'$push': '$_id'}}},
+            {'$match': {'count': {'$gt': 1}}},
+            {'$limit': limit},
+        ]))
+
+    @staticmethod
+    def query_shapes():
+        # student_list filters and point reads, for verify_query_plans.
+        collection = Student.collection()
+        return [
+            ('Student.get_by_id', collection, Student.build_query(student_id='example'), None),
+            ('Student.get_many', collection, {'_id': {'$in': ['example', 'other']}}, None),
+            ('Student.existing_emails', collection, {'email_lower': {'$in': ['a@example.com', 'b@example.com']}}, None),
+            ('student_list name', collection, Student.build_query(name='Example'), None),
+            ('student_list email', collection, Student.build_query(email='example@example.com'), None),
+            ('student_list age', collection, Student.build_query(age=20), None),
+            ('student_list name + age', collection, Student.build_query(name='Example', age=20), None),
+        ]
+
+    @staticmethod
+    def shadow_fields_update(document):
+        # The update bringing a stored document's shadow fields in line with
+        # with_shadow_fields; empty when they already are.
+        expected = Student.with_shadow_fields({field: document.get(field) for field in SHADOW_FIELDS})
+        update = {}
+        for shadow in SHADOW_FIELDS.values():
+            if shadow not in expected:
+                if shadow in document:
+                    update.setdefault('$unset', {})[shadow] = ''
+            elif document.get(shadow) != expected[shadow]:
+                update.setdefault('$set', {})[shadow] = expected[shadow]
+        return update
+
+    @staticmethod
+    def backfill_shadow_fields(batch_size=1000):
+        # Normalized in Python with Student.normalize, as writes do: $toLower
+        # neither strips nor lowercases beyond ASCII. Also repairs documents
+        # an older server-side backfill got wrong, including an email_lower of
+        # '' on students without an email, which collide in the unique index.
+        collection = Student.collection()
+        fields = {name: 1 for pair in SHADOW_FIELDS.items() for name in pair}
+        cursor = collection.find({}, fields).batch_size(batch_size)
+        updated = 0
+        operations = []
+        for document in cursor:
+            update = Student.shadow_fields_update(document)
+            if update:
+                operations.append(UpdateOne({'_id': document['_id']}, update))
+            if len(operations) == batch_size:
+                updated += collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+        return updated
+
+    @staticmethod
+    def build_query(name=None, age=None, email=None, student_id=None):
+        query = {}
+        if name:
+            query['name_lower'] = Student.normalize(name)
+        if age is not None:
+            query['age'] = int(age)
+        if email:
+            query['email_lower'] = Student.normalize(email)
+        if student_id:
+            query['_id'] = Student.normalize(student_id)
+        return query
+
+    @staticmethod
+    def find(query):
+        return [Student.to_public(student) for student in Student.collection().find(query)]
+
+    @staticmethod
+    def iter_find(query, batch_size=None):
+        # Streams from the server-side cursor, batch_size documents at a time.
+        cursor = Student.collection().find(query)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        for student in cursor:
+            yield Student.to_public(student)
+
+    @staticmethod
+    def get_by_id(student_id):
+        # Misses are cached as None, with a shorter TTL.
+        student_id = Student.normalize(student_id)
+        cache = get_student_cache()
+        student = cache.get(student_id)
+        if student is not MISSING:
+            return dict(student) if student is not None else None
+        student = Student.collection().find_one({'_id': student_id})
+        if student:
+            student = Student.to_public(student)
+            cache.add(student_id, dict(student))
+            return student
+        cache.add(student_id, None, ttl=negative_ttl())
+        return None
+
+    @staticmethod
+    def get_many(student_ids):
+        # Returns {id: student} for the ids that exist, with a single $in query.
+        ids = [Student.normalize(student_id) for student_id in student_ids]
+        return {student['_id']: student for student in Student.collection().find({'_id': {'$in': ids}})}
+
+    @staticmethod
+    def create(student):
+        try:
+            Student.collection().insert_one(Student.with_shadow_fields(student))
+        except DuplicateKeyError as e:
+            raise DuplicateStudent(duplicate_field(e.details or {}) or 'id or email')
+        # The id may have been probed (and cached as a miss) beforehand.
+        get_student_cache().delete(student['_id'])
+        return student
+
+    @staticmethod
+    def existing_emails(emails):
+        # Answered from the email_lower index alone (covered projection).
+        emails = [Student.normalize(email) for email in emails]
+        if not emails:
+            return set()
+        cursor = Student.collection().find({'email_lower': {'$in': emails}}, {'email_lower': 1, '_id': 0})
+        return {student['email_lower'] for student in cursor}
+
+    @staticmethod
+    def bulk_insert(students):
+        # Unordered so one bad row does not stop the rest of the batch.
+        # Returns the inserted count and (index, errors) pairs for failed rows;
+        # duplicate keys are reported against the field they collided on.
+        operations = [InsertOne(Student.with_shadow_fields(student)) for student in students]
+        if not operations:
+            return 0, []
+        try:
+            result = Student.collection().bulk_write(operations, ordered=False)
+            inserted, errors = result.inserted_count, []
+        except BulkWriteError as e:
+            details = e.details
+            inserted, errors = details['nInserted'], [(error['index'], Student.write_error(error)) for error in details['writeErrors']]
+        if inserted:
+            # Imported ids may have been probed (and cached as misses) beforehand.
+            failed = {index for index, _ in errors}
+            get_student_cache().delete_many([student['_id'] for index, student in enumerate(students) if index not in failed])
+        return inserted, errors
+
+    @staticmethod
+    def write_error(error):
+        if error.get('code') != DUPLICATE_KEY:
+            return error['errmsg']
+        field = duplicate_field(error)
+        if field:
+            return {field: [f'A student with this {field} already exists.']}
+        return 'A student with this id or email already exists.'
+
+    @staticmethod
+    def update(student_id, fields):
+        try:
+            result = Student.collection().update_one(
+                {'_id': Student.normalize(student_id)},
+                {'$set': Student.with_shadow_fields(fields)}
+            )
+        except DuplicateKeyError as e:
+            raise DuplicateStudent(duplicate_field(e.details or {}) or 'email')
+        if result.matched_count:
+            get_student_cache().delete(Student.normalize(student_id))
+        return result
+
+    @staticmethod
+    def delete(student_id):
+        result = Student.collection().delete_one({'_id': Student.normalize(student_id)})
+        if result.deleted_count:
+            get_student_cache().delete(Student.normalize(student_id))
+        return result
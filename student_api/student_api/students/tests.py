@@ -1,3 +1,208 @@
-from django.test import TestCase
+import contextvars
+import json
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.signals import request_started
+from django.test import SimpleTestCase
+from pymongo.errors import PyMongoError
+
+from mongo_common import changestreams, metrics, mongo_config
+from mongo_common.benchmarking import use_mongomock
+from mongo_common.cache import MISSING, build_cache
+from . import cache
+from .bulk import ingest, parse
+from .models import DuplicateStudent, Student
+
+
+def student(student_id, email, age=20):
+    return {'_id': student_id, 'name': 'Alice', 'age': age, 'email': email}
+
+
+class StudentCacheTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._student_cache = None
+
+    def test_writes_evict_cached_students(self):
+        Student.create(student('s1', 'alice@example.com'))
+        self.assertEqual(Student.get_by_id('s1')['age'], 20)
+        Student.update('s1', {'age': 21})
+        self.assertEqual(Student.get_by_id('s1')['age'], 21)
+        Student.delete('s1')
+        self.assertIsNone(Student.get_by_id('s1'))
+
+    def test_inserts_evict_cached_misses(self):
+        self.assertIsNone(Student.get_by_id('s1'))
+        self.assertIsNone(Student.get_by_id('s2'))
+        Student.create(student('s1', 'alice@example.com'))
+        Student.bulk_insert([student('s2', 'bob@example.com')])
+        self.assertIsNotNone(Student.get_by_id('s1'))
+        self.assertIsNotNone(Student.get_by_id('S2 '))
+
+    def test_reads_started_before_a_write_are_not_cached(self):
+        for backend in ('local', 'django'):
+            with self.subTest(backend=backend):
+                store = build_cache({'BACKEND': backend, 'TTL': 60}, prefix=f'race-{backend}:')
+                self.assertIs(store.get('s1'), MISSING)
+                store.delete('s1')
+                self.assertFalse(store.add('s1', {'age': 20}))
+                self.assertIs(store.get('s1'), MISSING)
+                self.assertTrue(store.add('s2', {'age': 21}))
+                store.clear()
+                store.add('s3', {'age': 22})
+                self.assertIs(store.get('s2'), MISSING)
+                self.assertIs(store.get('s3'), MISSING)
+
+
+class StudentImportTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._student_cache = None
+        Student.ensure_indexes()
+
+    def test_invalid_rows_are_reported_by_row_number(self):
+        lines = [
+            '{"name": "Alice", "age": 20, "email": "alice@example.com"}',
+            '{not json',
+            '',
+            '{"name": "", "age": 20, "email": "bob@example.com"}',
+            '{"name": "Carol", "age": -1, "email": "carol@example.com"}',
+            '{"name": "Dave", "age": 30, "email": "dave"}',
+        ]
+        summary = ingest(parse(lines, 'ndjson'))
+        self.assertEqual((summary['received'], summary['inserted'], summary['error_count']), (5, 1, 4))
+        self.assertEqual([(error['row'], list(error['errors'])) for error in summary['errors'][1:]], [
+            (3, ['name']), (4, ['age']), (5, ['email']),
+        ])
+
+    def test_duplicate_emails_are_skipped_across_chunks(self):
+        Student.create(student('s1', 'alice@example.com'))
+        lines = ['name,age,email', 'Alice,20,ALICE@example.com', 'Bob,21,bob@example.com', 'Bob,22, Bob@Example.com']
+        summary = ingest(parse(lines, 'csv'), chunk_size=1)
+        self.assertEqual(summary['inserted'], 1)
+        self.assertEqual([error['row'] for error in summary['errors']], [1, 3])
+
+    def test_unique_email_index(self):
+        Student.create(student('s1', 'alice@example.com'))
+        with self.assertRaises(DuplicateStudent):
+            Student.create(student('s2', 'Alice@Example.com'))
+        response = self.client.post('/api/students/?name=Alice&age=20&email=ALICE@example.com')
+        self.assertEqual(response.status_code, 409)
+
+    def test_export_takes_the_student_list_filters(self):
+        Student.bulk_insert([student('s1', 'alice@example.com'), student('s2', 'bob@example.com', age=30)])
+        for query, expected in (('id=S1', ['s1']), ('age=30', ['s2']), ('email=BOB@example.com', ['s2']), ('', ['s1', 's2'])):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/students/export/?{query}')
+                rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+                self.assertEqual(sorted(row['id'] for row in rows), expected)
+
+    def test_chunk_size_must_be_a_positive_integer(self):
+        for chunk_size in ('0', '-1', 'ten'):
+            with self.subTest(chunk_size=chunk_size):
+                response = self.client.post(f'/api/students/import/?chunk_size={chunk_size}', '', content_type='text/csv')
+                self.assertEqual(response.status_code, 400)
+
+
+
+class StudentChangeStreamTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+
+    def consumer(self):
+        consumer = cache.watch_students()
+        changestreams._consumers.remove(consumer)
+        return consumer
+
+    def test_only_a_shared_cache_elects_a_consumer(self):
+        self.assertFalse(self.consumer().shared)
+        with self.settings(STUDENT_CACHE={'BACKEND': 'django'}):
+            self.assertTrue(self.consumer().shared)
+
+    def test_one_worker_holds_the_lease_and_token(self):
+        first, second = self.consumer(), self.consumer()
+        second.owner = 'other-host:1'
+        self.assertTrue(first.acquire_lease())
+        self.assertFalse(second.acquire_lease())
+        first.save_token({'_data': '01'})
+        with self.assertRaises(changestreams.LeaseLost):
+            second.save_token({'_data': '02'})
+        self.assertEqual(second.load_token(), {'_data': '01'})
+
+
+
+class StudentBackfillTests(SimpleTestCase):
+    # mongomock's bulk_write rejects pymongo 4's UpdateOne, so this checks
+    # the per-document updates backfill_shadow_fields sends.
+    def test_shadow_fields_match_normalize(self):
+        self.assertEqual(
+            Student.shadow_fields_update({'_id': 's1', 'name': ' Élodie ', 'email': ' Elodie@Example.COM'}),
+            {'$set': {'name_lower': 'élodie', 'email_lower': 'elodie@example.com'}},
+        )
+        self.assertEqual(
+            Student.shadow_fields_update({'_id': 's2', 'name': 'Bob', 'name_lower': 'bob', 'email_lower': ''}),
+            {'$unset': {'email_lower': ''}},
+        )
+        self.assertEqual(Student.shadow_fields_update(
+            {'_id': 's3', 'name': 'Carol', 'email': 'carol@example.com', 'name_lower': 'carol', 'email_lower': 'carol@example.com'}
+        ), {})
+
+
+class StartupTaskTests(SimpleTestCase):
+    def test_failed_tasks_are_retried_in_the_background(self):
+        calls = []
+
+        def task():
+            calls.append(threading.current_thread().name)
+            if len(calls) == 1:
+                raise PyMongoError('not reachable')
+
+        mongo_config.on_first_request(task, dispatch_uid='tests.startup')
+        self.addCleanup(request_started.disconnect, dispatch_uid='tests.startup')
+        with self.settings(MONGO_STARTUP_RETRY_INTERVAL=0):
+            for expected in (1, 2, 2):
+                request_started.send(sender=None)
+                for thread in threading.enumerate():
+                    if thread.name == 'startup-tests.startup':
+                        thread.join()
+                self.assertEqual(len(calls), expected)
+        self.assertEqual(set(calls), {'startup-tests.startup'})
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        use_mongomock()
+        cache._student_cache = None
+
+    def count(self, name, **labels):
+        line = f'{name}_count{{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '} '
+        found = [row for row in metrics.registry.render().splitlines() if row.startswith(line)]
+        return int(found[0].split()[-1]) if found else 0
+
+    def test_streamed_requests_are_recorded_once_closed(self):
+        Student.create(student('s1', 'alice@example.com'))
+        labels = {'view': 'export_students', 'method': 'GET', 'status': 200}
+        before = self.count('http_request_duration_seconds', **labels)
+        response = self.client.get('/api/students/export/')
+        self.assertEqual(self.count('http_request_duration_seconds', **labels), before)
+        b''.join(response.streaming_content)
+        response.close()
+        response.close()
+        self.assertEqual(self.count('http_request_duration_seconds', **labels), before + 1)
+
+    def test_change_stream_commands_are_timed_apart(self):
+        event = mock.Mock(command_name='getMore', duration_micros=1000000)
+        def counts():
+            return (
+                self.count('mongo_command_duration_seconds', command='getMore'),
+                self.count('mongo_change_stream_command_duration_seconds', command='getMore'),
+            )
+
+        before = counts()
+        context = contextvars.copy_context()
+        context.run(metrics.long_polling.set, True)
+        context.run(metrics.command_listener.succeeded, event)
+        self.assertEqual(counts(), (before[0], before[1] + 1))
+        metrics.command_listener.succeeded(event)
+        self.assertEqual(counts(), (before[0] + 1, before[1] + 1))
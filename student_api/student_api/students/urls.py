@@ -3,7 +3,10 @@ from . import views
 
 urlpatterns = [
     path('students/', views.student_list, name='student_list'),
-    path('students/<str:id>/', views.read_student, name='read_student'),
-    path('students/<str:id>/update/', views.update_student, name='update_student'),
-    path('students/<str:id>/delete/', views.delete_student, name='delete_student'),
+    path('students/batch/', views.batch_students, name='batch_students'),
+    path('students/import/', views.import_students, name='import_students'),
+    path('students/export/', views.export_students, name='export_students'),
+    path('students/<str:student_id>/', views.read_student, name='read_student'),
+    path('students/<str:student_id>/update/', views.update_student, name='update_student'),
+    path('students/<str:student_id>/delete/', views.delete_student, name='delete_student'),
 ]
\ No newline at end of file
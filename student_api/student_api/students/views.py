@@ -1,18 +1,15 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import uuid
 import json
-from student_api.mongo_config import db
-from bson import ObjectId
-
-# Collections
-students_collection = db.students
+from .bulk import BULK_FORMATS, EXPORT_FORMATS, export, ingest, parse
+from .models import DuplicateStudent, Student
 
 @csrf_exempt
 def student_list(request):
     if request.method == 'GET':
         try:
-            query = {}
             # Check query parameters first
             name = request.GET.get('name')
             age = request.GET.get('age')
@@ -36,21 +33,12 @@ def student_list(request):
                     student_id = body_data['id']
 
             # Build the query
-            if name:
-                query['name'] = {'$regex': f'^{name}$', '$options': 'i'}
-            if age is not None:
-                try:
-                    query['age'] = int(age)
-                except ValueError:
-                    return JsonResponse({'error': 'Age must be a valid integer'}, status=400)
-            if email:
-                query['email'] = {'$regex': f'^{email}$', '$options': 'i'}
-            if student_id:
-                query['_id'] = {'$regex': f'^{student_id}$', '$options': 'i'}
-
-            students = list(students_collection.find(query))
-            for student in students:
-                student['id'] = str(student.pop('_id'))
+            try:
+                query = Student.build_query(name=name, age=age, email=email, student_id=student_id)
+            except ValueError:
+                return JsonResponse({'error': 'Age must be a valid integer'}, status=400)
+
+            students = Student.find(query)
             return JsonResponse(students, safe=False)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
@@ -92,7 +80,10 @@ def student_list(request):
                 'age': age,
                 'email': email
             }
-            students_collection.insert_one(student)
+            try:
+                Student.create(student)
+            except DuplicateStudent as e:
+                return JsonResponse({'error': str(e)}, status=409)
             student['id'] = student.pop('_id')
             return JsonResponse(student, status=201)
         except Exception as e:
@@ -111,7 +102,7 @@ def student_list(request):
             if not student_id:
                 return JsonResponse({'error': 'id query parameter is required to delete'}, status=400)
 
-            result = students_collection.delete_one({'_id': {'$regex': f'^{student_id}$', '$options': 'i'}})
+            result = Student.delete(student_id)
             if result.deleted_count > 0:
                 return JsonResponse({'message': 'Student deleted'})
             return JsonResponse({'error': 'Student not found'}, status=404)
@@ -120,12 +111,84 @@ def student_list(request):
 
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
+@csrf_exempt
+def batch_students(request):
+    # GET ?ids=a,b,c or POST {"ids": [...]} for lists too long for a query string.
+    if request.method not in ('GET', 'POST'):
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        ids = request.GET.get('ids')
+        if request.method == 'POST':
+            try:
+                body_data = json.loads(request.body or b'{}')
+            except json.JSONDecodeError:
+                return JsonResponse({'error': 'Invalid JSON format in request body'}, status=400)
+            ids = body_data.get('ids') if isinstance(body_data, dict) else None
+        if isinstance(ids, str):
+            ids = ids.split(',')
+        ids = list(dict.fromkeys(Student.normalize(i) for i in (ids or []) if str(i).strip()))
+        if not ids:
+            return JsonResponse({'error': 'ids is required'}, status=400)
+        maximum = getattr(settings, 'BATCH_MAX_IDS', 500)
+        if len(ids) > maximum:
+            return JsonResponse({'error': f'At most {maximum} ids per request'}, status=400)
+
+        found = Student.get_many(ids)
+        return JsonResponse({
+            'results': [Student.to_public(found[i]) for i in ids if i in found],
+            'missing': [i for i in ids if i not in found],
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@csrf_exempt
+def import_students(request):
+    # POST an NDJSON or CSV body; rows are validated and inserted in chunks.
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        content_type = request.content_type or 'application/x-ndjson'
+        if content_type not in BULK_FORMATS:
+            return JsonResponse({'error': f"Content-Type must be one of: {', '.join(BULK_FORMATS)}"}, status=415)
+        try:
+            chunk_size = int(request.GET['chunk_size']) if request.GET.get('chunk_size') else None
+            if chunk_size is not None and chunk_size < 1:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({'error': 'chunk_size must be a positive integer'}, status=400)
+        summary = ingest(parse(request, BULK_FORMATS[content_type]), chunk_size=chunk_size)
+        return JsonResponse(summary)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+def export_students(request):
+    # GET ?format=ndjson|csv plus the student_list filters, streamed.
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        data_format = request.GET.get('format', 'ndjson')
+        if data_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+        try:
+            query = Student.build_query(
+                name=request.GET.get('name'),
+                age=request.GET.get('age') or None,
+                email=request.GET.get('email'),
+                student_id=request.GET.get('id'),
+            )
+        except ValueError:
+            return JsonResponse({'error': 'Age must be a valid integer'}, status=400)
+        response = StreamingHttpResponse(export(query, data_format), content_type=EXPORT_FORMATS[data_format])
+        response['Content-Disposition'] = f'attachment; filename="students.{data_format}"'
+        return response
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
 def read_student(request, student_id):
     if request.method == 'GET':
         try:
-            student = students_collection.find_one({'_id': {'$regex': f'^{student_id}$', '$options': 'i'}})
+            student = Student.get_by_id(student_id)
             if student:
-                student['id'] = str(student.pop('_id'))
                 return JsonResponse(student)
             return JsonResponse({'error': 'Student not found'}, status=404)
         except Exception as e:
@@ -136,9 +199,9 @@ from rest_framework.response import Response
 from rest_framework import status
 
 @api_view(['PUT', 'PATCH'])
-def update_student(request):
+def update_student(request, student_id=None):
     try:
-        student_id = request.query_params.get('id')  # equivalent to request.GET
+        student_id = student_id or request.query_params.get('id')  # equivalent to request.GET
 
         if not student_id:
             return Response({'error': 'id is required in the query parameters'}, status=status.HTTP_400_BAD_REQUEST)
@@ -159,10 +222,10 @@ def update_student(request):
             return Response({'error': 'No valid fields to update'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Update the student in the database
-        result = students_collection.update_one(
-            {'_id': {'$regex': f'^{student_id}$', '$options': 'i'}},
-            {'$set': update_fields}
-        )
+        try:
+            result = Student.update(student_id, update_fields)
+        except DuplicateStudent as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
 
         if result.modified_count:
             return Response({'message': 'Student updated'}, status=status.HTTP_200_OK)
@@ -177,7 +240,7 @@ def update_student(request):
 def delete_student(request, student_id):
     if request.method == 'DELETE':
         try:
-            result = students_collection.delete_one({'_id': {'$regex': f'^{student_id}$', '$options': 'i'}})
+            result = Student.delete(student_id)
             if result.deleted_count:
                 return JsonResponse({'message': 'Student deleted'})
             return JsonResponse({'error': 'Student not found'}, status=404)